@@ -0,0 +1,36 @@
+"""Benchmark per-report latency of the native and pandoc HTML engines
+"""
+import tempfile
+import timeit
+
+from pathlib import Path
+from ouroboreport.report import Report
+
+
+def make_report(n_sections):
+    """Make a small synthetic report with `n_sections` sections
+    """
+    report = Report(title="Benchmark")
+    for i in range(n_sections):
+        report.add_header1(f"Section {i}")
+        report.add_paragraph("Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+        report.add_unordered_list([f"item {j}" for j in range(10)])
+    return report
+
+
+def main(repeat=20):
+    """Print mean save latency per engine
+    """
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        dest = Path(tmpdirname) / "report.html"
+        for n_sections in (1, 10, 100):
+            report = make_report(n_sections)
+            for engine in ("native", "pandoc"):
+                seconds = timeit.timeit(lambda: report.save_html(dest, engine=engine),
+                                        number=repeat)
+                print(f"sections={n_sections:<4} engine={engine:<7} "
+                      f"{1000 * seconds / repeat:8.2f} ms/report")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Benchmark list component rendering from 10^3 to 10^6 items
+"""
+import timeit
+
+from ouroboreport.components import CheckboxList
+from ouroboreport.components import OrderedList
+from ouroboreport.components import UnorderedList
+
+
+def main(repeat=3):
+    """Print render time per item, which should stay flat as lists grow
+    """
+    for cls in (UnorderedList, OrderedList, CheckboxList):
+        for exponent in range(3, 7):
+            n_items = 10 ** exponent
+            component = cls(f"item {i}" for i in range(n_items))
+            for method in ("to_markdown", "to_html"):
+                render = getattr(component, method)
+                seconds = min(timeit.repeat(render, number=1, repeat=repeat))
+                print(f"{cls.__name__:<14} {method:<12} items=10^{exponent} "
+                      f"{1000 * seconds:9.2f} ms {1e9 * seconds / n_items:7.1f} ns/item")
+
+
+if __name__ == "__main__":
+    main()
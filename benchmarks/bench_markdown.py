@@ -0,0 +1,45 @@
+"""Benchmark peak memory of joined versus streamed markdown rendering
+"""
+import os
+import tracemalloc
+
+from ouroboreport.renderers import MarkdownRenderer
+from ouroboreport.report import Report
+
+
+def make_report(n_sections):
+    """Make a synthetic report with `n_sections` sections of lists
+    """
+    report = Report(title="Benchmark")
+    for i in range(n_sections):
+        report.add_header2(f"Section {i}")
+        report.add_unordered_list([f"item {j}" for j in range(50)])
+    return report
+
+
+def peak_kib(func):
+    """Return peak traced memory in KiB while running `func`
+    """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    """Print peak memory of both render paths as report size grows
+    """
+    renderer = MarkdownRenderer()
+    with open(os.devnull, "w") as devnull:
+        for n_sections in (100, 1000, 10000):
+            report = make_report(n_sections)
+            components = report.get_components()
+            joined = peak_kib(lambda: devnull.write(renderer._render_markdown(components)))
+            streamed = peak_kib(lambda: renderer.write(report, devnull))
+            print(f"sections={n_sections:<6} joined={joined:10.1f} KiB "
+                  f"streamed={streamed:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
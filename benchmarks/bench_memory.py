@@ -0,0 +1,42 @@
+"""Benchmark memory and render time of list-backed versus compact reports
+"""
+import os
+import time
+import tracemalloc
+
+from ouroboreport.report import Report
+
+
+def build(n_categories, compact):
+    """Build the README's groupby-per-category report pattern
+    """
+    report = Report(title="Benchmark", compact=compact, cache_size=0)
+    report.add_header1("Scatter Plots")
+    for i in range(n_categories):
+        report.add_header2(f"category {i}")
+        report.add_paragraph(f"Summary of category {i}")
+        report.add_plot(f"plots/category_{i}.png", title=f"category {i} scatter")
+    return report
+
+
+def main():
+    """Print memory per component and markdown render time
+    """
+    for n_categories in (10 ** 4, 10 ** 5):
+        for compact in (False, True):
+            tracemalloc.start()
+            report = build(n_categories, compact)
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            n_components = len(report.get_components())
+
+            with open(os.devnull, "w") as devnull:
+                start = time.perf_counter()
+                report.save_markdown(devnull)
+                seconds = time.perf_counter() - start
+            print(f"categories={n_categories:<7} compact={compact!s:<5} "
+                  f"{size / n_components:7.1f} B/component  render={seconds:6.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark merging shard reports with sum(), += and Report.merge
+"""
+import time
+
+from ouroboreport.report import Report
+
+
+def make_shards(n_shards, compact=False):
+    """Make `n_shards` reports of 100 components each
+    """
+    shards = []
+    for i in range(n_shards):
+        shard = Report(title=f"Shard {i}", compact=compact)
+        for j in range(50):
+            shard.add_header2(f"Section {i}.{j}")
+            shard.add_paragraph("Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+        shards.append(shard)
+    return shards
+
+
+def main():
+    """Print seconds to merge growing numbers of shards per strategy
+    """
+    for compact in (False, True):
+        for n_shards in (10, 100, 1000):
+            shards = make_shards(n_shards, compact)
+
+            start = time.perf_counter()
+            sum(shards[1:], shards[0])
+            summed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            merged = Report(compact=compact)
+            for shard in shards:
+                merged += shard
+            inplace = time.perf_counter() - start
+
+            start = time.perf_counter()
+            Report.merge(*shards)
+            merge = time.perf_counter() - start
+            print(f"compact={compact!s:<5} shards={n_shards:<5} sum={summed:8.4f} s "
+                  f"+={inplace:8.4f} s merge={merge:8.4f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Benchmark per-conversion pandoc overhead, one-shot versus the server pool
+"""
+import time
+
+from ouroboreport import pandoc
+
+
+def main(n_conversions=50):
+    """Print mean conversion latency with and without the shared pool
+    """
+    text = "# Header\n\nSome *markdown* text.\n"
+    start = time.perf_counter()
+    for _ in range(n_conversions):
+        pandoc.convert_text(text, "html", "markdown")
+    oneshot = (time.perf_counter() - start) / n_conversions
+
+    pool = pandoc.start_pool(size=2)
+    pandoc.convert_text(text, "html", "markdown")
+    start = time.perf_counter()
+    for _ in range(n_conversions):
+        pandoc.convert_text(text, "html", "markdown")
+    pooled = (time.perf_counter() - start) / n_conversions
+    pandoc.stop_pool()
+
+    print(f"one-shot {1000 * oneshot:7.2f} ms/conversion")
+    print(f"pool     {1000 * pooled:7.2f} ms/conversion "
+          f"(disabled={pool.disabled}, fallbacks={pool.fallbacks})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Benchmark PDF latency per pandoc PDF engine
+"""
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+from ouroboreport.report import Report
+
+
+ENGINES = ("pdflatex", "xelatex", "lualatex", "tectonic", "weasyprint", "wkhtmltopdf")
+
+
+def make_report(n_sections):
+    """Make a synthetic report with `n_sections` sections
+    """
+    report = Report(title="Benchmark")
+    for i in range(n_sections):
+        report.add_header1(f"Section {i}")
+        report.add_paragraph("Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+        report.add_unordered_list([f"item {j}" for j in range(5)])
+    return report
+
+
+def main(repeat=3):
+    """Print mean PDF save latency per installed engine, warm caches after the first run
+    """
+    report = make_report(20)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        root = Path(tmpdirname)
+        for engine in ENGINES:
+            if not shutil.which(engine):
+                print(f"engine={engine:<12} not installed")
+                continue
+            report.save_pdf(root / "report.pdf", engine=engine, cache_dir=root / "cache")
+            start = time.perf_counter()
+            for _ in range(repeat):
+                report.save_pdf(root / "report.pdf", engine=engine, cache_dir=root / "cache")
+            seconds = (time.perf_counter() - start) / repeat
+            print(f"engine={engine:<12} {1000 * seconds:8.1f} ms/report")
+
+
+if __name__ == "__main__":
+    main()
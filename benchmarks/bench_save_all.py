@@ -0,0 +1,55 @@
+"""Benchmark exporting one report to several formats serially and via save_all
+"""
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+from ouroboreport.report import Report
+
+
+def make_report(n_sections):
+    """Make a synthetic report with `n_sections` sections
+    """
+    report = Report(title="Benchmark")
+    for i in range(n_sections):
+        report.add_header1(f"Section {i}")
+        report.add_paragraph("Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+        report.add_ordered_list([f"item {j}" for j in range(20)])
+    return report
+
+
+def destinations(root):
+    """Markdown plus independent pandoc conversions (PDF only if pdflatex exists)
+    """
+    dests = {"markdown": root / "report.md",
+             "html": {"destination": root / "report.html", "engine": "pandoc"}}
+    if shutil.which("pdflatex"):
+        dests["pdf"] = root / "report.pdf"
+    return dests
+
+
+def main():
+    """Print serial and concurrent export time per report size
+    """
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        root = Path(tmpdirname)
+        dests = destinations(root)
+        print(f"formats: {', '.join(dests)}")
+        for n_sections in (10, 100, 1000):
+            start = time.perf_counter()
+            report = make_report(n_sections)
+            for fmt, dest in dests.items():
+                kwargs = dest if isinstance(dest, dict) else {"destination": dest}
+                getattr(report, f"save_{fmt}")(**kwargs)
+            serial = time.perf_counter() - start
+
+            start = time.perf_counter()
+            report = make_report(n_sections)
+            report.save_all(dests)
+            concurrent = time.perf_counter() - start
+            print(f"sections={n_sections:<5} serial={serial:7.3f} s save_all={concurrent:7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
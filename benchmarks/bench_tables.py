@@ -0,0 +1,47 @@
+"""Benchmark Table rendering against DataFrame.to_markdown (tabulate)
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from ouroboreport.components import Table
+
+
+def make_frame(n_rows, n_cols=5):
+    """Make a synthetic frame of mixed float, int and string columns
+    """
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(n_cols):
+        if i % 3 == 0:
+            data[f"f{i}"] = rng.random(n_rows)
+        elif i % 3 == 1:
+            data[f"i{i}"] = rng.integers(0, 1000, n_rows)
+        else:
+            data[f"s{i}"] = rng.choice(["alpha", "beta", "gamma"], n_rows)
+    return pd.DataFrame(data)
+
+
+def seconds(func):
+    """Wall time of a single call
+    """
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    """Print render time per method as frames grow
+    """
+    for n_rows in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6):
+        df = make_frame(n_rows)
+        table = Table(df, copy=False)
+        print(f"rows={n_rows:<8} Table.to_markdown {seconds(table.to_markdown):8.3f} s")
+        print(f"rows={n_rows:<8} Table.to_html     {seconds(table.to_html):8.3f} s")
+        if n_rows <= 10 ** 5:
+            print(f"rows={n_rows:<8} df.to_markdown    {seconds(df.to_markdown):8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
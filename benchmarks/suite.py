@@ -0,0 +1,265 @@
+"""Benchmark suite of components, renderers and end-to-end exports with JSON results
+
+Run `python -m benchmarks.suite --output results.json` to time every case on
+synthetic reports of growing size, and `python -m benchmarks.suite compare
+old.json new.json` to list cases that got slower between two result files.
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ouroboreport.components import CheckboxList
+from ouroboreport.components import Header
+from ouroboreport.components import OrderedList
+from ouroboreport.components import Paragraph
+from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.components import UnorderedList
+from ouroboreport.renderers import ConfluenceRenderer
+from ouroboreport.renderers import HTMLRenderer
+from ouroboreport.renderers import MarkdownRenderer
+from ouroboreport.renderers import PDFRenderer
+from ouroboreport.report import Report
+
+
+SIZES = {"quick": (10, 100), "full": (10, 100, 1000)}
+
+# 1x1 transparent PNG
+PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6300010000000500010d0a2db40000000049454e44ae426082")
+
+
+def make_report(n_sections, plots_dir=None):
+    """Make a synthetic report with `n_sections` sections of text, lists and a table
+
+    With `plots_dir` every section also gets a plot written to that directory.
+    """
+    report = Report(title="Benchmark")
+    for i in range(n_sections):
+        report.add_header1(f"Section {i}")
+        report.add_paragraph("Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+        report.add_unordered_list([f"item {j}" for j in range(20)])
+        report.add_table(make_dataframe(10, 5))
+        if plots_dir is not None:
+            report.add_plot(make_plot(plots_dir, i), title=f"Plot {i}")
+    return report
+
+
+def make_dataframe(n_rows, n_cols):
+    """Make a DataFrame of floats with `n_rows` rows and `n_cols` columns
+    """
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.random((n_rows, n_cols)), columns=[f"c{j}" for j in range(n_cols)])
+
+
+def make_plot(plots_dir, i):
+    """Write a small PNG to `plots_dir` and return its path
+    """
+    path = Path(plots_dir) / f"plot{i}.png"
+    path.write_bytes(PNG)
+    return path
+
+
+def component_cases(size):
+    """Components scaled by `size`: headers, huge lists, wide tables and plots
+    """
+    items = [f"item {j}" for j in range(100 * size)]
+    return {
+        "Header": [Header(f"Header {i}", i % 4 + 1) for i in range(size)],
+        "Paragraph": [Paragraph("Lorem ipsum dolor sit amet. " * 10) for _ in range(size)],
+        "UnorderedList": [UnorderedList(items)],
+        "OrderedList": [OrderedList(items)],
+        "CheckboxList": [CheckboxList(items)],
+        "Table": [Table(make_dataframe(100, size))],
+        "Plot": [Plot(f"plots/plot{i}.png", title=f"Plot {i}") for i in range(size)],
+    }
+
+
+class StubConfluenceHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Confluence REST API, answering after `server.latency`
+    """
+    def do_GET(self):
+        self._respond({"id": "1", "version": {"number": 1}, "results": []})
+
+    def do_PUT(self):
+        self.do_POST()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._respond({"id": "1", "results": []})
+
+    def _respond(self, body):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def start_confluence_stub(latency=0.0):
+    """Serve the stub Confluence API in a daemon thread, returning the server
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubConfluenceHandler)
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timeit(func, repeat):
+    """Call `func` once to warm up, then `repeat` times, returning timings in seconds
+    """
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(sizes=SIZES["full"], repeat=5, latency=0.0):
+    """Time every benchmark case, yielding one result dict per case and size
+    """
+    def result(name, params, timings):
+        return {"name": name, "params": params, "repeat": len(timings),
+                "min": min(timings), "mean": statistics.mean(timings),
+                "median": statistics.median(timings)}
+
+    for size in sizes:
+        for name, components in component_cases(size).items():
+            for fmt in ("markdown", "html"):
+                def render(components=components, fmt=fmt):
+                    for component in components:
+                        getattr(component, f"to_{fmt}")()
+                timings = timeit(render, repeat)
+                yield result(f"component.{name}.to_{fmt}", {"size": size}, timings)
+
+    server = start_confluence_stub(latency)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    has_pdflatex = shutil.which("pdflatex") is not None
+    try:
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            root = Path(tmpdirname)
+            for size in sizes:
+                plots_dir = root / f"plots{size}"
+                plots_dir.mkdir()
+                report = make_report(size, plots_dir)
+                renderers = {
+                    "MarkdownRenderer": lambda: MarkdownRenderer().save(report, root / "r.md"),
+                    "HTMLRenderer": lambda: HTMLRenderer().save(report, root / "r.html"),
+                    "HTMLRenderer.cp_img_to_path": lambda: HTMLRenderer(
+                        cp_img_to_path=True).save(report, root / "html" / "r.html"),
+                    "HTMLRenderer.embed_images": lambda: HTMLRenderer(
+                        embed_images=True).save(report, root / "r.html"),
+                    "ConfluenceRenderer": lambda: ConfluenceRenderer(
+                        space="BENCH", url=url, username="user", token="token").save(report),
+                }
+                if has_pdflatex:
+                    renderers["PDFRenderer"] = lambda: PDFRenderer().save(report, root / "r.pdf")
+                (root / "html").mkdir(exist_ok=True)
+                for name, save in renderers.items():
+                    timings = timeit(save, repeat)
+                    yield result(f"renderer.{name}.save", {"sections": size}, timings)
+
+                exports = {"markdown": root / "all.md", "html": root / "all.html"}
+                if has_pdflatex:
+                    exports["pdf"] = root / "all.pdf"
+
+                def save_all():
+                    # keep every run cold: the report's render cache outlives save_all
+                    report.render_cache.clear()
+                    report.save_all(exports)
+
+                timings = timeit(save_all, repeat)
+                yield result("report.save_all", {"sections": size, "formats": sorted(exports)},
+                             timings)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def environment():
+    """Describe the package version and interpreter the results were measured with
+    """
+    try:
+        version = metadata.version("ouroboreport")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {"ouroboreport": version, "python": platform.python_version(),
+            "platform": platform.platform(), "pandas": pd.__version__,
+            "timestamp": datetime.now().isoformat(timespec="seconds")}
+
+
+def compare(old, new, threshold=1.2):
+    """Get (name, params, old median, new median) of cases slower by over `threshold`
+    """
+    def key(case):
+        return case["name"], json.dumps(case["params"], sort_keys=True)
+
+    baseline = {key(case): case for case in old["results"]}
+    regressions = []
+    for case in new["results"]:
+        before = baseline.get(key(case))
+        if before is not None and case["median"] > threshold * before["median"]:
+            regressions.append((case["name"], case["params"], before["median"], case["median"]))
+    return regressions
+
+
+def main(argv=None):
+    """Run the suite and write JSON results, or compare two result files
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command")
+    parser.add_argument("--output", default="-", help="JSON results file, '-' for stdout")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sizes", choices=sorted(SIZES), default="full")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds the stub Confluence server waits per request")
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        old = json.loads(Path(args.old).read_text())
+        new = json.loads(Path(args.new).read_text())
+        regressions = compare(old, new, args.threshold)
+        for name, params, before, after in regressions:
+            print(f"{name} {params}: {1000 * before:.3f} ms -> {1000 * after:.3f} ms")
+        return 1 if regressions else 0
+
+    results = []
+    for case in run(SIZES[args.sizes], args.repeat, args.latency):
+        print(f"{case['name']:<45} {json.dumps(case['params']):<40} "
+              f"{1000 * case['median']:10.3f} ms", file=sys.stderr)
+        results.append(case)
+    output = json.dumps({"environment": environment(), "results": results}, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        Path(args.output).write_text(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
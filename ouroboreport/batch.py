@@ -0,0 +1,71 @@
+"""Saving fleets of reports in parallel
+"""
+import time
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+
+BatchResult = namedtuple("BatchResult", ["report", "fmt", "seconds", "error"])
+
+# Formats that wait on local pandoc subprocesses versus remote HTTP calls
+LANES = {"markdown": "subprocess", "html": "subprocess", "pdf": "subprocess",
+         "confluence": "network"}
+
+
+class ReportBatch():
+    """Save many reports to many destinations over separate executor lanes
+
+    Markdown/HTML/PDF exports run in the "subprocess" lane, `workers` wide,
+    using processes if `processes` is set and threads otherwise. Confluence
+    exports run in the "network" lane of `network_workers` threads. A failing
+    export is recorded in its result and does not stop the rest of the batch,
+    as is a job that cannot be run at all, such as a report that cannot be
+    pickled for a worker process, with `seconds` None.
+    """
+    def __init__(self, workers=None, network_workers=8, processes=False):
+        self.workers = workers
+        self.network_workers = network_workers
+        self.processes = processes
+        self.jobs = []
+
+    def add(self, report, destinations):
+        """Add a report and its destinations, in the format of `Report.save_all`
+        """
+        unknown = set(destinations) - set(LANES)
+        if unknown:
+            raise ValueError(f"Unknown formats {sorted(unknown)}, expected any of {list(LANES)}")
+        for fmt, dest in destinations.items():
+            kwargs = dest if isinstance(dest, dict) else {"destination": dest}
+            self.jobs.append((report, fmt, kwargs))
+
+    def run(self):
+        """Run all exports, returning a `BatchResult` per export in the order added
+        """
+        subprocess_executor = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+        with subprocess_executor(max_workers=self.workers) as subprocess_lane, \
+                ThreadPoolExecutor(max_workers=self.network_workers) as network_lane:
+            lanes = {"subprocess": subprocess_lane, "network": network_lane}
+            futures = [lanes[LANES[fmt]].submit(_timed_save, report, fmt, kwargs)
+                       for report, fmt, kwargs in self.jobs]
+            results = []
+            for (report, fmt, _), future in zip(self.jobs, futures):
+                try:
+                    seconds, error = future.result()
+                except Exception as err:  # pylint: disable=broad-except
+                    # The job never ran, e.g. the report could not be pickled
+                    seconds, error = None, err
+                results.append(BatchResult(report, fmt, seconds, error))
+        return results
+
+
+def _timed_save(report, fmt, kwargs):
+    """Save report to one format, returning elapsed seconds and any error raised
+    """
+    start = time.perf_counter()
+    try:
+        getattr(report, f"save_{fmt}")(**kwargs)
+    except Exception as err:  # pylint: disable=broad-except
+        return time.perf_counter() - start, err
+    return time.perf_counter() - start, None
@@ -0,0 +1,68 @@
+"""Memoization of rendered component output
+"""
+from collections import namedtuple
+from collections import OrderedDict
+
+from ouroboreport.shared import LockedState
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class RenderCache(LockedState):
+    """Bounded LRU cache of component output keyed by content digest and format
+
+    Components without a `digest` method, or whose digest is None, are
+    rendered without caching. The cache may be shared between threads.
+    """
+    def __init__(self, maxsize=1024):
+        super().__init__()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def render(self, component, fmt, digest=None):
+        """Render component to format ("markdown" or "html"), reusing cached output
+
+        Pass the component's `digest` if it is already known to skip hashing it.
+        """
+        render = getattr(component, f"to_{fmt}")
+        if not self.maxsize or not hasattr(component, "digest"):
+            return render()
+
+        if digest is None:
+            digest = component.digest()
+        if digest is None:
+            return render()
+
+        key = (digest, fmt)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        output = render()
+        with self._lock:
+            self._entries[key] = output
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return output
+
+    def info(self):
+        """Get hit/miss counters and size of the cache
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        """Drop cached output and reset counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -1,14 +1,68 @@
 """Components to comprise a report
 """
 
+import hashlib
+import html
+import re
+
 from abc import ABC
 from abc import abstractmethod
 from pathlib import Path
 
 
+def _digest(*parts):
+    """Hex digest of the repr of `parts`
+    """
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+# Inline markdown converted by the native HTML engine
+_INLINE_SPAN = re.compile(r"`([^`]+)`|\[([^\]]+)\]\(([^)\s]+)\)")
+_STRONG = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|(?<!\w)__(?=\S)(.+?)(?<=\S)__(?!\w)")
+_EMPHASIS = re.compile(r"\*(?=\S)(.+?)(?<=\S)\*|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)")
+
+
+def _inline_html(text):
+    """Escape text for HTML, converting inline markdown code spans, links and emphasis
+    """
+    text = str(text)
+    parts = []
+    position = 0
+    for match in _INLINE_SPAN.finditer(text):
+        parts.append(_emphasis_html(text[position:match.start()]))
+        code, label, href = match.groups()
+        if code is not None:
+            parts.append(f"<code>{html.escape(code)}</code>")
+        else:
+            parts.append(f'<a href="{html.escape(href)}">{_emphasis_html(label)}</a>')
+        position = match.end()
+    parts.append(_emphasis_html(text[position:]))
+    return "".join(parts)
+
+
+def _emphasis_html(text):
+    """Escape text for HTML, converting markdown strong and emphasis
+    """
+    text = html.escape(text)
+    text = _STRONG.sub(lambda match: f"<strong>{match.group(1) or match.group(2)}</strong>", text)
+    return _EMPHASIS.sub(lambda match: f"<em>{match.group(1) or match.group(2)}</em>", text)
+
+
+def _as_list(content):
+    """Materialize any iterable of list items as a list without copying lists
+    """
+    if isinstance(content, list):
+        return content
+    if hasattr(content, "tolist"):
+        return content.tolist()
+    return list(content)
+
+
 class AbstractComponent(ABC):
     """Abstract Component
     """
+    __slots__ = ()
+
     @abstractmethod
     def to_html(self):
         """Convert content to html format
@@ -23,7 +77,11 @@ class AbstractComponent(ABC):
 
 class Component(AbstractComponent):
     """Concrete Component
+
+    Components declare their attributes in `__slots__` to stay small when a
+    report holds very many of them.
     """
+    __slots__ = ()
     content = ""
 
     def __eq__(self, other):
@@ -31,10 +89,27 @@ class Component(AbstractComponent):
         """
         return self.content == other.content
 
+    def digest(self):
+        """Hash of everything that affects rendering, used as render cache key
+        """
+        return _digest(type(self).__name__, sorted(self._state().items()))
+
+    def _state(self):
+        """Get attributes of the component, from its slots and any `__dict__`
+        """
+        state = dict(getattr(self, "__dict__", {}))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
 
 class Header(Component):
     """Header Component
     """
+    __slots__ = ("content", "level")
+
     def __init__(self, content, level=1):
         self.content = content
         self.level = level
@@ -42,7 +117,7 @@ class Header(Component):
     def to_html(self):
         """Convert content to html format
         """
-        return f"<h{self.level}>{self.content}</h{self.level}>"
+        return f"<h{self.level}>{_inline_html(self.content)}</h{self.level}>"
 
     def to_markdown(self):
         """Convert content to markdown format
@@ -54,13 +129,15 @@ class Header(Component):
 class Paragraph(Component):
     """Paragraph Component
     """
+    __slots__ = ("content",)
+
     def __init__(self, content):
         self.content = content
 
     def to_html(self):
         """Convert content to html format
         """
-        return f"<p>{self.content}</p>"
+        return f"<p>{_inline_html(self.content)}</p>"
 
     def to_markdown(self):
         """Convert content to markdown format
@@ -70,14 +147,18 @@ class Paragraph(Component):
 
 class UnorderedList(Component):
     """Unordered list component
+
+    Content may be any iterable (list, generator, NumPy array, pandas Series),
+    it is materialized once so the list can be rendered repeatedly.
     """
+    __slots__ = ("content",)
     top_html_tag = "<ul>"
     bottom_html_tag = "</ul>"
     item_open_html_tag = "<li>"
     item_close_html_tag = "</li>"
     md_prefix = "* "
     def __init__(self, content):
-        self.content = content
+        self.content = _as_list(content)
 
     def __eq__(self, other):
         """Test compoent equality
@@ -90,32 +171,38 @@ class UnorderedList(Component):
     def to_html(self):
         """Convert content to html format
         """
-        html = self.top_html_tag + "\n"
-        for item in self.content:
-            html += f"{self.item_open_html_tag}{str(item)}{self.item_close_html_tag}\n"
-        html += self.bottom_html_tag
-        return html
+        if not self.content:
+            return f"{self.top_html_tag}\n{self.bottom_html_tag}"
+        separator = f"{self.item_close_html_tag}\n{self.item_open_html_tag}"
+        items = separator.join(map(_inline_html, self.content))
+        return (f"{self.top_html_tag}\n{self.item_open_html_tag}{items}"
+                f"{self.item_close_html_tag}\n{self.bottom_html_tag}")
 
     def to_markdown(self):
         """Convert content to markdown format
         """
-        return "\n".join([f"{self.md_prefix}{str(c)}" for c in self.content]) + "\n"
+        if not self.content:
+            return "\n"
+        return self.md_prefix + f"\n{self.md_prefix}".join(map(str, self.content)) + "\n"
 
 
 class OrderedList(UnorderedList):
     """Order list component
     """
+    __slots__ = ()
     top_html_tag = "<ol>"
     bottom_html_tag = "</ol>"
     def to_markdown(self):
         """Convert content to markdown format
         """
-        return "\n".join([f"{i+1}. {str(c)}" for i, c in enumerate(self.content)]) + "\n"
+        numbered = (f"{i}. {item}" for i, item in enumerate(self.content, start=1))
+        return "\n".join(numbered) + "\n"
 
 
 class CheckboxList(UnorderedList):
     """Checkbox list component
     """
+    __slots__ = ()
     top_html_tag = '<ul class="task-list">'
     bottom_html_tag = "</ul>"
     item_open_html_tag = '<li><input type="checkbox" disabled="" />\n'
@@ -126,16 +213,33 @@ class CheckboxList(UnorderedList):
 class Plot(Component):
     """Plot component
     """
+    __slots__ = ("_filepath", "title", "alttxt")
+
     def __init__(self, filepath, title="", alttxt=""):
-        self.filepath = Path(filepath)
+        self._filepath = str(filepath)
         self.title = title
         self.alttxt  = alttxt
-        self.content = "|".join([filepath, title, alttxt])
+
+    @property
+    def filepath(self):
+        """Path of the plot image
+        """
+        return Path(self._filepath)
+
+    @filepath.setter
+    def filepath(self, filepath):
+        self._filepath = str(filepath)
+
+    @property
+    def content(self):
+        """Plot path, title and alt text, used to compare plots
+        """
+        return "|".join([self._filepath, self.title, self.alttxt])
 
     def set_path(self, filepath):
         """Set path for Plot object
         """
-        self.filepath = Path(filepath)
+        self._filepath = str(filepath)
 
     def get_path(self):
         """Get path from Plot object
@@ -145,9 +249,267 @@ class Plot(Component):
     def to_html(self):
         """Convert content to html format
         """
-        return f'<p><img href="{self.filepath}" title="{self.title}">{self.alttxt}</img></p>'
+        src, title, alt = map(html.escape, (self._filepath, self.title, self.alttxt))
+        return f'<p><img src="{src}" alt="{alt}" title="{title}" /></p>'
+
+    def to_markdown(self):
+        """Convert content to markdown format
+        """
+        return f'![{self.alttxt}]({self._filepath} "{self.title}")'
+
+
+class Table(Component):
+    """Table component from a pandas DataFrame
+
+    Cells are formatted one whole column at a time rather than cell by cell,
+    with any rounding applied to the column array up front. Long or wide frames
+    are truncated to their first and last rows/columns when `max_rows`/`max_cols`
+    are set.
+    """
+    __slots__ = ("content", "max_rows", "max_cols", "precision", "index")
+    ellipsis = "..."
+
+    def __init__(self, df, max_rows=None, max_cols=None, precision=None,
+                 index=True, copy=True):
+        self.content = df.copy() if copy else df
+        self.max_rows = max_rows
+        self.max_cols = max_cols
+        self.precision = precision
+        self.index = index
+
+    def __eq__(self, other):
+        """Test compoent equality
+        """
+        return isinstance(other, Table) and self.content.equals(other.content)
+
+    def digest(self):
+        """Hash of frame data and render options, used as render cache key
+
+        None when cells cannot be hashed (e.g. lists or dicts), so the table is
+        rendered without caching.
+        """
+        from pandas.util import hash_pandas_object  # pylint: disable=import-outside-toplevel
+        df = self.content
+        try:
+            rows = hash_pandas_object(df, index=True).to_numpy().tobytes()
+        except TypeError:
+            return None
+        options = (self.max_rows, self.max_cols, self.precision, self.index)
+        return _digest(type(self).__name__, list(df.columns), list(df.columns.names),
+                       list(df.index.names), list(df.dtypes), options,
+                       hashlib.blake2b(rows, digest_size=16).hexdigest())
+
+    def to_html(self):
+        """Convert content to html format
+        """
+        header, columns, _ = self._format(escape=html.escape)
+        head = "<tr><th>" + "</th><th>".join(header) + "</th></tr>"
+        rows = map("</td><td>".join, zip(*columns))
+        body = "</td></tr>\n<tr><td>".join(rows)
+        body = f"<tr><td>{body}</td></tr>\n" if columns and columns[0] else ""
+        return f"<table>\n<thead>\n{head}\n</thead>\n<tbody>\n{body}</tbody>\n</table>"
+
+    def to_markdown(self):
+        """Convert content to markdown format
+        """
+        header, columns, numeric = self._format(escape=_escape_markdown_cell)
+        rule = ["---:" if is_numeric else "---" for is_numeric in numeric]
+        head = "| " + " | ".join(header) + " |\n|" + "|".join(rule) + "|\n"
+        rows = " |\n| ".join(map(" | ".join, zip(*columns)))
+        body = f"| {rows} |\n" if columns and columns[0] else ""
+        return head + body
+
+    def _format(self, escape):
+        """Format header and columns of the (truncated) frame as lists of strings
+
+        Returns the header, one list of cell strings per column and a flag per
+        column for whether it is numeric.
+        """
+        df = self.content
+        n_rows, n_cols = df.shape
+        head_rows, tail_rows = _split_limit(n_rows, self.max_rows)
+        head_cols, tail_cols = _split_limit(n_cols, self.max_cols)
+        if tail_rows or tail_cols:
+            df = df.iloc[_outer_positions(n_rows, head_rows, tail_rows),
+                         _outer_positions(n_cols, head_cols, tail_cols)]
+
+        series = list(df.items())
+        if self.index:
+            series.insert(0, (df.index.name, df.index.to_series()))
+
+        header, columns, numeric = [], [], []
+        for name, column in series:
+            cells, is_numeric = self._format_column(column, escape)
+            if tail_rows:
+                cells.insert(head_rows, self.ellipsis)
+            header.append(escape("" if name is None else str(name)))
+            columns.append(cells)
+            numeric.append(is_numeric)
+
+        if tail_cols:
+            position = head_cols + int(self.index)
+            header.insert(position, self.ellipsis)
+            columns.insert(position, [self.ellipsis] * len(columns[0]))
+            numeric.insert(position, False)
+        return header, columns, numeric
+
+    def _format_column(self, column, escape):
+        """Format every cell of one column in a single pass
+        """
+        values = column.to_numpy()
+        kind = values.dtype.kind
+        if kind in "biuf":
+            if kind == "f" and self.precision is not None:
+                values = values.round(self.precision)
+            return list(map(str, values.tolist())), True
+        return list(map(escape, column.astype(str).tolist())), False
+
+
+def _split_limit(n_items, limit):
+    """Split `limit` into head and tail counts if `n_items` exceeds it
+
+    Returns `(n_items, 0)` when nothing needs truncating.
+    """
+    if limit is None or n_items <= limit:
+        return n_items, 0
+    tail = limit // 2
+    return limit - tail, tail
+
+
+def _outer_positions(n_items, head, tail):
+    """Positions of the first `head` and last `tail` of `n_items`
+    """
+    return list(range(head)) + list(range(n_items - tail, n_items))
+
+
+def _escape_markdown_cell(cell):
+    """Escape characters that would break a markdown table cell
+    """
+    if "|" in cell or "\n" in cell:
+        return cell.replace("|", "\\|").replace("\n", " ")
+    return cell
+
+
+class TablePreview(Table):
+    """Preview of a large table linking to its full data at `filepath`
+
+    Renders the first and last rows (`max_rows` in total), summary statistics
+    of the columns if `summary` and a link to the full data. Only the preview
+    rows are hashed for the render cache. Statistics are rounded to
+    `precision`, or 3 decimals if it is not set.
+
+    With `attachment` the full data is a Confluence page attachment named
+    `filepath`, linked in markdown with raw wiki markup for pandoc to pass on.
+    """
+    __slots__ = ("filepath", "summary", "attachment")
+
+    def __init__(self, df, filepath, max_rows=10, max_cols=None, precision=None,
+                 index=True, summary=True, attachment=False):
+        super().__init__(df, max_rows=max_rows, max_cols=max_cols, precision=precision,
+                         index=index, copy=False)
+        self.filepath = str(filepath)
+        self.attachment = attachment
+        self.summary = None
+        if summary and df.shape[1]:
+            self.summary = Table(df.describe(), max_cols=max_cols,
+                                 precision=3 if precision is None else precision)
+
+    def __eq__(self, other):
+        """Test compoent equality
+        """
+        return (isinstance(other, TablePreview) and self.filepath == other.filepath
+                and self.attachment == other.attachment and super().__eq__(other))
+
+    def digest(self):
+        """Hash of the preview rows, summary, link and render options
+        """
+        n_rows = self.content.shape[0]
+        head, tail = _split_limit(n_rows, self.max_rows)
+        preview = Table(self.content.iloc[_outer_positions(n_rows, head, tail)],
+                        max_cols=self.max_cols, precision=self.precision, index=self.index,
+                        copy=False)
+        rows = preview.digest()
+        if rows is None:
+            return None
+        summary = self.summary.digest() if self.summary is not None else None
+        return _digest(type(self).__name__, self.filepath, self.attachment, self.content.shape,
+                       self.max_rows, rows, summary)
+
+    def _caption(self):
+        n_rows, n_cols = self.content.shape
+        return f"Full data: {n_rows} rows x {n_cols} columns"
+
+    def to_html(self):
+        """Convert content to html format
+        """
+        parts = [super().to_html()]
+        if self.summary is not None:
+            parts.append(self.summary.to_html())
+        parts.append(f'<p><a href="{html.escape(self.filepath)}">{self._caption()}</a></p>')
+        return "\n".join(parts)
+
+    def to_markdown(self):
+        """Convert content to markdown format
+        """
+        parts = [super().to_markdown()]
+        if self.summary is not None:
+            parts.append(self.summary.to_markdown())
+        if self.attachment:
+            parts.append(f"`[{self._caption()}|^{self.filepath}]`{{=jira}}")
+        else:
+            parts.append(f"[{self._caption()}]({self.filepath})")
+        return "\n".join(parts)
+
+
+class Lazy(Component):
+    """Component whose content is computed only when it is first rendered
+
+    `factory` is called with no arguments and returns a component, or the
+    first argument of `wrapper` (e.g. a plot path for `Plot`, a DataFrame for
+    `Table`) which is then called with it and `kwargs`. With `memoize` the
+    result is kept, so each format renders without calling `factory` again.
+    """
+    __slots__ = ("factory", "wrapper", "kwargs", "memoize", "_component")
+
+    def __init__(self, factory, wrapper=None, memoize=True, **kwargs):
+        self.factory = factory
+        self.wrapper = wrapper
+        self.kwargs = kwargs
+        self.memoize = memoize
+        self._component = None
+
+    def __eq__(self, other):
+        """Test compoent equality
+        """
+        return (isinstance(other, Lazy) and self.factory == other.factory
+                and self.wrapper == other.wrapper and self.kwargs == other.kwargs)
+
+    def resolve(self):
+        """Compute the component, reusing the memoized one if available
+        """
+        if self._component is not None:
+            return self._component
+        component = self.factory()
+        if self.wrapper is not None:
+            component = self.wrapper(component, **self.kwargs)
+        if self.memoize:
+            self._component = component
+        return component
+
+    def digest(self):
+        """Digest of the computed component, None when not memoized
+        """
+        if not self.memoize:
+            return None
+        component = self.resolve()
+        return component.digest() if hasattr(component, "digest") else None
+
+    def to_html(self):
+        """Convert content to html format
+        """
+        return self.resolve().to_html()
 
     def to_markdown(self):
         """Convert content to markdown format
         """
-        return f'![{self.alttxt}]({self.filepath} "{self.title}")'
+        return self.resolve().to_markdown()
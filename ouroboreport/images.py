@@ -0,0 +1,134 @@
+"""Embedding plot images as data URIs for self-contained output
+"""
+import base64
+import io
+import mimetypes
+
+from collections import OrderedDict
+from itertools import repeat
+from pathlib import Path
+
+from ouroboreport.shared import filedigest
+from ouroboreport.shared import LockedState
+
+
+# Formats Pillow may re-encode, vector and animated images are embedded as-is
+RESIZABLE = {"image/png": "PNG", "image/jpeg": "JPEG", "image/webp": "WEBP"}
+# Re-encoded formats that keep transparency
+ALPHA_FORMATS = ("PNG", "WEBP")
+
+
+def encode_image(filepath, max_size=None, quality=85):
+    """Get image file as a base64 data URI
+
+    With `max_size` raster images larger than `max_size` pixels in width or
+    height are downscaled to fit and recompressed (needs Pillow). The original
+    bytes are kept whenever they are smaller.
+    """
+    mime = mimetypes.guess_type(str(filepath))[0] or "application/octet-stream"
+    data = Path(filepath).read_bytes()
+    if max_size is not None and mime in RESIZABLE:
+        data = _downscale(data, RESIZABLE[mime], max_size, quality)
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def _downscale(data, fmt, max_size, quality):
+    """Shrink image bytes to fit in a `max_size` square and recompress them
+    """
+    try:
+        from PIL import Image  # pylint: disable=import-outside-toplevel
+    except ImportError as err:
+        raise ImportError("Downscaling images needs Pillow, install ouroboreport[images]"
+                          ) from err
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((max_size, max_size))
+        out = io.BytesIO()
+        if fmt == "PNG":
+            image.save(out, fmt, optimize=True)
+        else:
+            mode = "RGBA" if fmt in ALPHA_FORMATS and _has_alpha(image) else "RGB"
+            image.convert(mode).save(out, fmt, quality=quality, optimize=True)
+    recompressed = out.getvalue()
+    return recompressed if len(recompressed) < len(data) else data
+
+
+def _has_alpha(image):
+    """Test if a Pillow image has an alpha channel or a transparent palette color
+    """
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+
+class ImageCache(LockedState):
+    """Bounded LRU cache of data URIs keyed by file content hash and encoding options
+
+    The cache may be shared between threads.
+    """
+    def __init__(self, maxsize=256):
+        super().__init__()
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get cached data URI, None if missing
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, uri):
+        """Store a data URI, evicting the least recently used beyond `maxsize`
+        """
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = uri
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def encode_images(filepaths, max_size=None, quality=85, workers=None, cache=None):
+    """Get data URIs of several image files, in order
+
+    Each distinct file content is encoded once. When there is more than one
+    image to encode and `workers` is not 1, images are encoded in a pool of
+    `workers` processes if they are downscaled, or threads if they are only
+    read and base64 encoded. Pass an `ImageCache` to reuse URIs across calls.
+    """
+    digests = [(filedigest(filepath), Path(filepath).suffix.lower()) for filepath in filepaths]
+    uris = {}
+    pending = {}
+    for digest, filepath in zip(digests, filepaths):
+        key = (*digest, max_size, quality)
+        uri = cache.get(key) if cache is not None else None
+        if uri is not None:
+            uris[digest] = uri
+        else:
+            pending[digest] = filepath
+
+    if len(pending) > 1 and workers != 1:
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures import ThreadPoolExecutor
+
+        resizing = max_size is not None and any(
+            mimetypes.guess_type(str(filepath))[0] in RESIZABLE for filepath in pending.values())
+        executor = ProcessPoolExecutor if resizing else ThreadPoolExecutor
+        with executor(max_workers=workers) as pool:
+            encoded = pool.map(encode_image, pending.values(), repeat(max_size),
+                               repeat(quality))
+            encoded = list(encoded)
+    else:
+        encoded = [encode_image(filepath, max_size, quality) for filepath in pending.values()]
+
+    for digest, uri in zip(pending, encoded):
+        uris[digest] = uri
+        if cache is not None:
+            cache.put((*digest, max_size, quality), uri)
+    return [uris[digest] for digest in digests]
@@ -0,0 +1,130 @@
+"""Section-level incremental rebuilds backed by an on-disk render manifest
+"""
+import hashlib
+import json
+
+from pathlib import Path
+from ouroboreport.components import Header
+from ouroboreport.shared import textdigest
+
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def split_sections(components):
+    """Split components into sections, each starting at a Header
+
+    Components before the first header form a section of their own.
+    """
+    sections = []
+    for component in components:
+        if isinstance(component, Header) or not sections:
+            sections.append([])
+        sections[-1].append(component)
+    return sections
+
+
+def section_digest(section):
+    """Digest of a section's components, None if any cannot be digested
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for component in section:
+        component_digest = component.digest() if hasattr(component, "digest") else None
+        if component_digest is None:
+            return None
+        digest.update(component_digest.encode())
+    return digest.hexdigest()
+
+
+def manifest_path(dest):
+    """Path of the manifest kept next to an output file
+    """
+    dest = Path(dest)
+    return dest.with_name(dest.name + MANIFEST_SUFFIX)
+
+
+class RenderManifest():
+    """Digest and character span of each section of a rendered output file
+
+    `content` is the digest of the whole output, used to detect edits made to
+    the file since it was written.
+    """
+    def __init__(self, fmt, sections=None, length=0, content=None):
+        self.fmt = fmt
+        self.sections = sections or []
+        self.length = length
+        self.content = content
+
+    @classmethod
+    def load(cls, path, fmt):
+        """Load manifest from path, None if missing, unreadable or for another format
+        """
+        try:
+            with open(path) as infile:
+                data = json.load(infile)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != MANIFEST_VERSION or data.get("format") != fmt:
+            return None
+        return cls(fmt, [tuple(section) for section in data["sections"]], data["length"],
+                   data.get("content"))
+
+    def save(self, path):
+        """Write manifest to path as JSON
+        """
+        data = {"version": MANIFEST_VERSION, "format": self.fmt, "length": self.length,
+                "content": self.content, "sections": self.sections}
+        with open(path, "w") as out:
+            json.dump(data, out)
+
+    def spans(self):
+        """Map each section digest to its (start, end) span in the output
+        """
+        return {digest: (start, end) for digest, start, end in self.sections
+                if digest is not None}
+
+
+def save_sections(dest, sections, render_section, fmt, separator="\n", trailer=""):
+    """Write sections to dest, reusing unchanged sections of the previous output
+
+    Sections whose digest matches one in the previous manifest are copied
+    from the previous output instead of calling `render_section`, unless the
+    output was edited since it was written. Returns the number of sections
+    rendered.
+    """
+    dest = Path(dest)
+    previous = RenderManifest.load(manifest_path(dest), fmt)
+    spans, old_text = {}, ""
+    if previous is not None and dest.exists():
+        with open(dest, newline="") as infile:
+            old_text = infile.read()
+        if len(old_text) == previous.length and textdigest(old_text) == previous.content:
+            spans = previous.spans()
+
+    manifest = RenderManifest(fmt)
+    chunks = []
+    position = 0
+    rendered = 0
+    for i, section in enumerate(sections):
+        if i:
+            chunks.append(separator)
+            position += len(separator)
+        digest = section_digest(section)
+        if digest in spans:
+            start, end = spans[digest]
+            text = old_text[start:end]
+        else:
+            text = render_section(section)
+            rendered += 1
+        chunks.append(text)
+        manifest.sections.append((digest, position, position + len(text)))
+        position += len(text)
+    chunks.append(trailer)
+    manifest.length = position + len(trailer)
+    manifest.content = textdigest("".join(chunks))
+
+    with open(dest, "w", newline="") as out:
+        out.writelines(chunks)
+    manifest.save(manifest_path(dest))
+    return rendered
@@ -0,0 +1,97 @@
+"""Offloading large tables to sidecar files with an in-page preview
+"""
+import os
+import uuid
+
+from ouroboreport.components import Lazy
+from ouroboreport.components import Table
+from ouroboreport.components import TablePreview
+from ouroboreport.shared import ifnotexistmkdir
+from ouroboreport.shared import textdigest
+
+
+# Fast gzip level, formatting the CSV text dominates writing time anyway
+COMPRESSLEVEL = 1
+
+
+class TableOffload():
+    """Policy replacing tables of over `max_cells` cells with a linked preview
+
+    The full table is written to a sidecar file, a gzip compressed CSV or,
+    with `fmt="parquet"`, a Parquet file (needs pyarrow), named by content
+    hash so unchanged tables are not written again. Parquet is much faster to
+    write for large frames. In the page the table is replaced by a
+    `TablePreview` of `preview_rows` rows with summary statistics if `summary`.
+    """
+    formats = {"csv": ".csv.gz", "parquet": ".parquet"}
+
+    def __init__(self, max_cells=10_000, fmt="csv", preview_rows=10, summary=True):
+        if fmt not in self.formats:
+            raise ValueError(f"Unknown table format '{fmt}', expected one of {list(self.formats)}")
+        self.max_cells = max_cells
+        self.fmt = fmt
+        self.preview_rows = preview_rows
+        self.summary = summary
+
+    def table(self, component):
+        """Get component as a Table if it is large enough to offload, None otherwise
+
+        Lazy tables are resolved to check their size. Previews are never offloaded.
+        """
+        if isinstance(component, Lazy) and isinstance(component.wrapper, type) \
+                and issubclass(component.wrapper, Table):
+            component = component.resolve()
+        if isinstance(component, Table) and not isinstance(component, TablePreview) \
+                and component.content.size > self.max_cells:
+            return component
+        return None
+
+    def write(self, table, directory):
+        """Write full table data to a sidecar file in directory, returning its path
+
+        The file is written under a temporary name and moved onto its path, so
+        saves offloading the same table concurrently do not collide. Gzip
+        headers carry no timestamp or file name, so rewrites are byte-identical.
+        """
+        path = ifnotexistmkdir(directory) / f"table-{_table_digest(table)}{self.formats[self.fmt]}"
+        if path.exists():
+            return path
+        df = table.content
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp, "wb") as out:
+                if self.fmt == "parquet":
+                    df = df.set_axis([str(name) for name in df.columns], axis=1)
+                    df.to_parquet(out, index=table.index)
+                else:
+                    df.to_csv(out, index=table.index,
+                              compression={"method": "gzip", "compresslevel": COMPRESSLEVEL,
+                                           "mtime": 0, "filename": ""})
+            os.replace(tmp, path)
+        finally:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+        return path
+
+    def preview(self, table, link, attachment=False):
+        """Preview of table linking to its full data at `link`
+
+        With `attachment` the link is the name of a Confluence page attachment.
+        """
+        return TablePreview(table.content, link, max_rows=self.preview_rows,
+                            max_cols=table.max_cols, precision=table.precision,
+                            index=table.index, summary=self.summary, attachment=attachment)
+
+
+def _table_digest(table):
+    """Digest naming the sidecar file of table
+
+    Frames with cells pandas cannot hash, such as lists, are hashed by their
+    JSON form and axis names instead.
+    """
+    digest = table.digest()
+    if digest is None:
+        df = table.content
+        digest = textdigest(repr((df.to_json(orient="split", default_handler=str),
+                                  df.index.names, df.columns.names, table.index)))
+    return digest
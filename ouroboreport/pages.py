@@ -0,0 +1,153 @@
+"""Splitting oversized reports into linked pages
+"""
+import html
+import re
+
+from pathlib import Path
+from urllib.parse import quote
+
+from ouroboreport.components import Header
+from ouroboreport.components import Lazy
+from ouroboreport.components import Table
+
+
+# Assumed characters per rendered table cell when estimating page size
+CELL_CHARS = 10
+# Characters escaped with a backslash in link labels and titles per format
+SPECIAL_CHARS = {"markdown": "\\`*_[]<>", "jira": "\\[]|{}"}
+
+
+def size_hint(component):
+    """Rough rendered size of a component in characters, without rendering it
+
+    Memoized Lazy components are resolved, since they are rendered from the
+    same result. Lazy tables are estimated from their factory's `shape` if it
+    has one, as segment tables do. Other Lazy components count as 0.
+    """
+    if isinstance(component, Lazy):
+        shape = getattr(component.factory, "shape", None)
+        if shape is not None and isinstance(component.wrapper, type) \
+                and issubclass(component.wrapper, Table):
+            kwargs = component.kwargs
+            return _table_hint(shape, kwargs.get("max_rows"), kwargs.get("max_cols"))
+        if not component.memoize:
+            return 0
+        component = component.resolve()
+    if isinstance(component, Table):
+        return _table_hint(component.content.shape, component.max_rows, component.max_cols)
+    content = getattr(component, "content", "")
+    if isinstance(content, str):
+        return len(content)
+    try:
+        return sum(len(str(item)) + 4 for item in content)
+    except TypeError:
+        return 0
+
+
+def _table_hint(shape, max_rows, max_cols):
+    """Rough rendered size of a table of `shape` truncated to `max_rows` and `max_cols`
+    """
+    rows, cols = shape
+    if max_rows is not None:
+        rows = min(rows, max_rows + 1)
+    if max_cols is not None:
+        cols = min(cols, max_cols + 1)
+    return (rows + 2) * (cols + 1) * CELL_CHARS
+
+
+def escape(fmt, text):
+    """Escape text for a title or link label in format ("markdown", "html" or "jira")
+    """
+    if fmt == "html":
+        return html.escape(text)
+    return re.sub(f"([{re.escape(SPECIAL_CHARS[fmt])}])", r"\\\1", text)
+
+
+class Page():
+    """Part of a report rendered as a document of its own
+    """
+    def __init__(self, number, title, components):
+        self.number = number
+        self.title = title
+        self.components = components
+
+    def get_components(self):
+        """Get list of page components
+        """
+        return self.components
+
+
+class Paginator():
+    """Splits a report into pages at headers and size thresholds
+
+    A page starts at each Header of `level` or above (1 being the highest),
+    set `level=None` to ignore headers. With `max_chars` a page also ends
+    before the component that would take its estimated size (see `size_hint`)
+    past `max_chars`. Pages are rendered in up to `workers` threads.
+    """
+    def __init__(self, level=1, max_chars=None, workers=None):
+        self.level = level
+        self.max_chars = max_chars
+        self.workers = workers
+
+    def split(self, components):
+        """Split components into lists of page components
+        """
+        pages = []
+        size = 0
+        for component in components:
+            hint = size_hint(component) if self.max_chars is not None else 0
+            breaks = (self.level is not None and isinstance(component, Header)
+                      and component.level <= self.level)
+            full = self.max_chars is not None and size and size + hint > self.max_chars
+            if not pages or breaks or full:
+                pages.append([])
+                size = 0
+            pages[-1].append(component)
+            size += hint
+        return pages
+
+    def pages(self, report):
+        """Split report into `Page`s titled by their first header
+        """
+        pages = []
+        for number, components in enumerate(self.split(report.get_components()), start=1):
+            headers = [c for c in components if isinstance(c, Header)]
+            title = str(headers[0].content) if headers else f"Page {number}"
+            pages.append(Page(number, title, components))
+        return pages
+
+    @staticmethod
+    def page_path(dest, number):
+        """Path of page `number` next to the index at `dest`
+        """
+        dest = Path(dest)
+        return dest.with_name(f"{dest.stem}-{number:03d}{dest.suffix}")
+
+
+def index_document(fmt, title, links):
+    """Index page in format ("markdown" or "html") linking (title, href) pairs
+    """
+    if fmt == "html":
+        items = "".join(f'<li><a href="{_href(fmt, href)}">{escape(fmt, text)}</a></li>\n'
+                        for text, href in links)
+        return f"<h1>{escape(fmt, title)}</h1>\n<ul>\n{items}</ul>\n"
+    items = "".join(f"* [{escape(fmt, text)}]({_href(fmt, href)})\n" for text, href in links)
+    return f"# {escape(fmt, title)}\n\n{items}"
+
+
+def navigation(fmt, index, previous=None, following=None):
+    """Links to the index and the previous and following pages
+    """
+    links = [("Previous", previous), ("Index", index), ("Next", following)]
+    if fmt == "html":
+        anchors = [f'<a href="{_href(fmt, href)}">{text}</a>' for text, href in links if href]
+        return f"<p>{' | '.join(anchors)}</p>\n"
+    return " | ".join(f"[{text}]({_href(fmt, href)})" for text, href in links if href) + "\n"
+
+
+def _href(fmt, href):
+    """Percent-encode a relative link, escaping it for an HTML attribute if needed
+    """
+    href = quote(href)
+    return html.escape(href) if fmt == "html" else href
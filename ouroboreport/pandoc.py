@@ -0,0 +1,219 @@
+"""Shared pandoc conversion backend
+
+Every pypandoc conversion starts a fresh pandoc process. `start_pool` starts
+long-lived `pandoc server` processes instead, which all renderers then share
+through `convert_text`. If the servers cannot be started, or a request to
+them fails, conversion falls back to a one-shot pandoc process.
+"""
+import atexit
+import itertools
+import json
+import socket
+import subprocess
+import threading
+import time
+
+
+class PandocServerError(Exception):
+    """Raised when a pandoc server cannot start or fails a conversion
+    """
+
+
+class PandocServer():
+    """A long-lived `pandoc server` process converting text over HTTP
+    """
+    def __init__(self, pandoc_path=None, startup_timeout=5.0, timeout=60.0):
+        self.pandoc_path = pandoc_path
+        self.startup_timeout = startup_timeout
+        self.timeout = timeout
+        self.process = None
+        self.url = None
+
+    def start(self):
+        """Start the server on a free local port and wait until it is healthy
+        """
+        port = _free_port()
+        pandoc_path = self.pandoc_path or _pypandoc().get_pandoc_path()
+        self.process = subprocess.Popen([pandoc_path, "server", "--port", str(port)],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.healthy():
+                return self
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.05)
+        self.stop()
+        raise PandocServerError("pandoc server did not start")
+
+    def healthy(self):
+        """Test the server process is running and answers requests
+        """
+        import urllib.request  # pylint: disable=import-outside-toplevel
+
+        if self.process is not None and self.process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{self.url}/version", timeout=1) as response:
+                return response.status == 200
+        except (OSError, ValueError):
+            return False
+
+    def convert(self, text, to, fmt):
+        """Convert text from format `fmt` to format `to`
+        """
+        import urllib.request  # pylint: disable=import-outside-toplevel
+
+        body = json.dumps({"text": text, "from": fmt, "to": to}).encode()
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json", "Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                result = json.load(response)
+        except (OSError, ValueError) as err:
+            raise PandocServerError(f"pandoc server request failed: {err}") from err
+        if "output" not in result or result.get("base64"):
+            raise PandocServerError(f"pandoc server could not convert to {to}: {result}")
+        return result["output"]
+
+    def stop(self):
+        """Terminate the server process
+        """
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        self.process = None
+
+
+class PandocPool():
+    """Pool of pandoc servers used round-robin, falling back to one-shot pandoc
+
+    Servers are started on first use. A server failing a request is taken
+    out of rotation, health checked and restarted once; a server that cannot
+    restart is dropped. If the pool cannot start at all, or loses its last
+    server, it is disabled and every conversion runs a one-shot pandoc process.
+    """
+    def __init__(self, size=2, server_factory=PandocServer):
+        self.size = size
+        self.server_factory = server_factory
+        self.disabled = False
+        self.fallbacks = 0
+        self._servers = None
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def convert_text(self, text, to, fmt):
+        """Convert text from format `fmt` to format `to`
+        """
+        server = self._next_server()
+        if server is not None:
+            try:
+                return server.convert(text, to, fmt)
+            except PandocServerError:
+                self._recover(server)
+        with self._lock:
+            self.fallbacks += 1
+        return _pypandoc().convert_text(text, to, fmt)
+
+    def health(self):
+        """Get whether each server in the pool is healthy
+        """
+        return [server.healthy() for server in self._servers or []]
+
+    def close(self):
+        """Stop all servers
+        """
+        with self._lock:
+            for server in self._servers or []:
+                server.stop()
+            self._servers = None
+
+    def _next_server(self):
+        with self._lock:
+            if self.disabled:
+                return None
+            if self._servers is None:
+                try:
+                    self._servers = [self.server_factory().start() for _ in range(self.size)]
+                except (OSError, PandocServerError):
+                    self.disabled = True
+                    return None
+            if not self._servers:
+                return None
+            return self._servers[next(self._turn) % len(self._servers)]
+
+    def _recover(self, server):
+        """Restart a server that failed a request unless it is still healthy
+
+        The server is taken out of rotation under the pool lock, so it is
+        restarted only once when several threads see it fail, and other
+        threads keep converting while it restarts.
+        """
+        with self._lock:
+            if server not in (self._servers or []):
+                return
+            self._servers.remove(server)
+
+        restarted = True
+        if not server.healthy():
+            server.stop()
+            try:
+                server.start()
+            except (OSError, PandocServerError):
+                restarted = False
+
+        with self._lock:
+            if restarted and self._servers is not None:
+                self._servers.append(server)
+                return
+            if self._servers is not None and not self._servers:
+                self.disabled = True
+        server.stop()
+
+
+_POOL = None
+
+
+def start_pool(size=2):
+    """Start a shared pool of `size` pandoc servers used by all renderers
+    """
+    global _POOL  # pylint: disable=global-statement
+    stop_pool()
+    _POOL = PandocPool(size=size)
+    return _POOL
+
+
+def stop_pool():
+    """Stop the shared pool, conversions go back to one-shot pandoc
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = None
+
+
+def convert_text(text, to, fmt):
+    """Convert text with the shared pool if started, one-shot pandoc otherwise
+    """
+    if _POOL is not None:
+        return _POOL.convert_text(text, to, fmt)
+    return _pypandoc().convert_text(text, to, fmt)
+
+
+def _pypandoc():
+    """Import pypandoc on first conversion rather than with this module
+    """
+    import pypandoc  # pylint: disable=import-outside-toplevel
+    return pypandoc
+
+
+def _free_port():
+    """Ask the OS for a free local TCP port
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+atexit.register(stop_pool)
@@ -0,0 +1,99 @@
+"""Opt-in timing instrumentation of report rendering
+"""
+import time
+
+from contextlib import contextmanager
+
+from ouroboreport.shared import LockedState
+
+
+class RenderProfile(LockedState):
+    """Accumulates per-stage and per-component-type render timings
+
+    Stages (e.g. "render", "pandoc", "write", "upload") record calls, seconds
+    and bytes. Component types record calls, seconds and characters rendered.
+    `emit` passes the summary to `callback` and/or logs it at INFO level to
+    `logger`.
+    """
+    def __init__(self, callback=None, logger=None):
+        super().__init__()
+        self.callback = callback
+        self.logger = logger
+        self._stages = {}
+        self._components = {}
+
+    @contextmanager
+    def stage(self, name, nbytes=0):
+        """Time the body of a with block as stage `name`
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start, nbytes)
+
+    def record_stage(self, name, seconds, nbytes=0):
+        """Add one call of stage `name`
+        """
+        with self._lock:
+            timings = self._stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0})
+            timings["calls"] += 1
+            timings["seconds"] += seconds
+            timings["bytes"] += nbytes
+
+    def record_component(self, type_name, seconds, nchars):
+        """Add one render of a component of type `type_name`
+        """
+        with self._lock:
+            component = self._components.setdefault(
+                type_name, {"calls": 0, "seconds": 0.0, "chars": 0})
+            component["calls"] += 1
+            component["seconds"] += seconds
+            component["chars"] += nchars
+
+    def to_dict(self):
+        """Get a copy of all timings as plain dicts
+        """
+        with self._lock:
+            return {"stages": {name: dict(timings) for name, timings in self._stages.items()},
+                    "components": {name: dict(component)
+                                   for name, component in self._components.items()}}
+
+    def emit(self, extra=None):
+        """Send the summary, updated with `extra`, to the callback and logger
+        """
+        summary = self.to_dict()
+        summary.update(extra or {})
+        if self.callback is not None:
+            self.callback(summary)
+        if self.logger is not None:
+            self.logger.info("ouroboreport render profile: %s", summary)
+        return summary
+
+    def reset(self):
+        """Drop all recorded timings
+        """
+        with self._lock:
+            self._stages.clear()
+            self._components.clear()
+
+
+def stage(profile, name, nbytes=0):
+    """Context timing stage `name` on `profile`, doing nothing if profile is None
+    """
+    if profile is None:
+        return _NULL_STAGE
+    return profile.stage(name, nbytes)
+
+
+class _NullStage():
+    """Reusable no-op context for disabled profiling
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
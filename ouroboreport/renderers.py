@@ -1,17 +1,34 @@
 """Renderers are the ogic that converts the pyrhon report extractions to intened formats
 """
 import os
+import subprocess
 import tempfile
+import time
 
 from abc import ABC
 from abc import abstractmethod
-from copy import deepcopy
-from shutil import copyfile
-import pypandoc
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from pathlib import Path
 
-from atlassian import Confluence
+from ouroboreport.components import Lazy
 from ouroboreport.components import Plot
+from ouroboreport.components import TablePreview
+from ouroboreport.images import encode_images
+from ouroboreport.manifest import save_sections
+from ouroboreport.manifest import split_sections
+from ouroboreport.pages import escape
+from ouroboreport.pages import index_document
+from ouroboreport.pages import navigation
+from ouroboreport.pandoc import convert_text
+from ouroboreport.profiling import stage
+from ouroboreport.shared import filedigest
 from ouroboreport.shared import ifnotexistmkdir
+from ouroboreport.shared import isfilelike
+from ouroboreport.shared import relocate_file
+from ouroboreport.shared import RELOCATIONS
+from ouroboreport.shared import textdigest
+from ouroboreport.view import ReportView
 
 
 
@@ -27,67 +44,293 @@ class AbstractRenderer(ABC):
 
 class MarkdownRenderer(AbstractRenderer):
     """Renderer that converts report to Markdown
+
+    Pass a `RenderCache` as `cache` to reuse output of unchanged components.
+    With `incremental` a manifest of section digests is kept next to the
+    output and re-saving only re-renders sections that changed. Pass a
+    `RenderProfile` as `profile` to record stage and component timings.
+    Pass a `Paginator` as `paginate` to save each page of the report to a file
+    of its own, linked from an index at the destination. Pass a `TableOffload`
+    as `offload` to write large tables to files in a `tables` directory next
+    to the output, linked from a preview in their place.
     """
+    def __init__(self, cache=None, incremental=False, profile=None, paginate=None,
+                 offload=None):
+        if incremental and paginate is not None:
+            raise ValueError("Incremental saves cannot be paginated")
+        self.cache = cache
+        self.incremental = incremental
+        self.profile = profile
+        self.paginate = paginate
+        self.offload = offload
+
     def save(self, report, dest):
-        """Save report to destination
+        """Save report to destination path or writable file-like object
+        """
+        if self.offload is not None:
+            if isfilelike(dest):
+                raise ValueError("Offloading tables needs a destination path")
+            report, _ = self._offload_tables(report, Path(dest).parent / "tables", "tables/")
+        if self.paginate is not None:
+            self._save_pages(report, dest, "markdown")
+            return
+        if self.incremental:
+            self._save_incremental(report, dest, "markdown")
+            return
+        with stage(self.profile, "write"):
+            if isfilelike(dest):
+                self.write(report, dest)
+                return
+            with open(str(dest), "w") as out:
+                self.write(report, out)
+
+    def write(self, report, out):
+        """Write report to file-like object one component at a time
         """
-        content = self._render_markdown(report.get_components())
-        with open(str(dest), "w") as out:
-            out.write(content)
+        for chunk in self.iter_markdown(report.get_components()):
+            out.write(chunk)
+
+    def iter_markdown(self, components):
+        """Yield markdown chunks for each component, separated by newlines
+        """
+        for i, component in enumerate(components):
+            if i:
+                yield "\n"
+            yield self._render_component(component, "markdown")
 
     def _render_markdown(self, components):
-        return "\n".join([c.to_markdown() for c in components])
+        return "".join(self.iter_markdown(components))
+
+    def _render_document(self, components):
+        return self._render_markdown(components).rstrip("\n") + "\n\n"
+
+    def _save_pages(self, report, dest, fmt):
+        """Save pages of report to their own files in parallel, with an index at dest
+        """
+        if isfilelike(dest):
+            raise ValueError("Paginated saves need a destination path")
+        pages = self.paginate.pages(report)
+        names = [self.paginate.page_path(dest, page.number).name for page in pages]
+        index = Path(dest).name
+
+        def save_page(i):
+            content = self._render_document(pages[i].get_components())
+            content += navigation(fmt, index, names[i - 1] if i else None,
+                                  names[i + 1] if i + 1 < len(names) else None)
+            with stage(self.profile, "write", len(content)):
+                with open(Path(dest).with_name(names[i]), "w") as out:
+                    out.write(content)
+
+        with ThreadPoolExecutor(max_workers=self.paginate.workers) as pool:
+            list(pool.map(save_page, range(len(pages))))
+        with open(dest, "w") as out:
+            out.write(index_document(fmt, report.title,
+                                     [(page.title, name) for page, name in zip(pages, names)]))
+
+    def _save_incremental(self, report, dest, fmt, trailer=""):
+        """Save report re-rendering only sections changed since the last save
+        """
+        if isfilelike(dest):
+            raise ValueError("Incremental saves need a destination path")
+
+        def render_section(section):
+            return "\n".join([self._render_component(c, fmt) for c in section])
+
+        sections = split_sections(report.get_components())
+        with stage(self.profile, "write"):
+            return save_sections(dest, sections, render_section, fmt, trailer=trailer)
+
+    def _offload_tables(self, report, directory, link_prefix="", attachment=False):
+        """Replace large tables with previews linking to sidecar files in directory
+
+        Links are the sidecar file names after `link_prefix`, or Confluence
+        attachment links if `attachment`. Returns the report view and the
+        (path, name) of each sidecar file.
+        """
+        out_report = ReportView(report)
+        sidecars = []
+        with stage(self.profile, "offload_tables"):
+            for i, component in enumerate(report.get_components()):
+                table = self.offload.table(component)
+                if table is None:
+                    continue
+                path = self.offload.write(table, directory)
+                out_report.substitute(i, self.offload.preview(table, link_prefix + path.name,
+                                                              attachment=attachment))
+                sidecars.append((path, path.name))
+        return out_report, sidecars
+
+    def _render_component(self, component, fmt):
+        if self.profile is not None:
+            return self._render_profiled(component, fmt)
+        if self.cache is None:
+            return getattr(component, f"to_{fmt}")()
+        return self.cache.render(component, fmt)
+
+    def _render_profiled(self, component, fmt):
+        start = time.perf_counter()
+        if self.cache is None:
+            output = getattr(component, f"to_{fmt}")()
+        else:
+            output = self.cache.render(component, fmt)
+        self.profile.record_component(type(component).__name__,
+                                      time.perf_counter() - start, len(output))
+        return output
 
 
 class HTMLRenderer(MarkdownRenderer):
-    """Renderer that converts Report to HTML via Markdown
+    """Renderer that converts Report to HTML
+
+    The default "native" engine calls each component's `to_html` in process.
+    The "pandoc" engine renders Markdown and converts it with pandoc instead.
+
+    With `cp_img_to_path` plots are placed in a `plots` directory next to the
+    output by `relocation` ("copy", "hardlink", "reflink" or "symlink"). With
+    `dedupe` they are named by content hash so each unique image is stored once
+    across all reports sharing the output directory.
+
+    With `embed_images` plots are instead embedded as data URIs, producing a
+    single self-contained file. Images larger than `image_max_size` pixels are
+    downscaled and recompressed in up to `image_workers` processes, otherwise
+    images are only read and encoded, in threads.
+    Pass an `ImageCache` as `image_cache` to reuse encodings across saves.
+
+    `incremental` saves are supported by the native engine only.
     """
-    def __init__(self, cp_img_to_path=False):
+    engines = ("native", "pandoc")
+
+    def __init__(self, cp_img_to_path=False, engine="native", cache=None,
+                 relocation="copy", dedupe=False, incremental=False, profile=None,
+                 embed_images=False, image_max_size=None, image_workers=None,
+                 image_cache=None, paginate=None, offload=None):
+        if engine not in self.engines:
+            raise ValueError(f"Unknown HTML engine '{engine}', expected one of {self.engines}")
+        if relocation not in RELOCATIONS:
+            raise ValueError(f"Unknown relocation '{relocation}', expected one of {RELOCATIONS}")
+        if incremental and engine != "native":
+            raise ValueError("Incremental saves need the native HTML engine")
+        if embed_images and cp_img_to_path:
+            raise ValueError("Plots are either embedded or copied, not both")
+        super().__init__(cache=cache, incremental=incremental, profile=profile,
+                         paginate=paginate, offload=offload)
         self.cp_img_to_path = cp_img_to_path
+        self.engine = engine
+        self.relocation = relocation
+        self.dedupe = dedupe
+        self.embed_images = embed_images
+        self.image_max_size = image_max_size
+        self.image_workers = image_workers
+        self.image_cache = image_cache
 
     def save(self, report, dest):
         """Save report to destination
         """
         # if `cp_img_to_path` then copy files and update Report object
         if self.cp_img_to_path:
-            report = self._relocate_image_files(dest, report)
-
-        content = self._render_markdown(report.get_components())
-        content = pypandoc.convert_text(content, "html", "markdown")
-        with open(dest, "w") as out:
-            out.write(content)
+            with stage(self.profile, "relocate_images"):
+                report = self._relocate_image_files(dest, report)
+        if self.embed_images:
+            with stage(self.profile, "embed_images"):
+                report = self._embed_image_files(report)
+        if self.offload is not None:
+            report, _ = self._offload_tables(report, Path(dest).parent / "tables", "tables/")
+
+        if self.paginate is not None:
+            self._save_pages(report, dest, "html")
+            return
+        if self.incremental:
+            self._save_incremental(report, dest, "html", trailer="\n")
+            return
+
+        content = self._render_html(report.get_components())
+        with stage(self.profile, "write", len(content)):
+            with open(dest, "w") as out:
+                out.write(content)
+
+    def _render_html(self, components):
+        if self.engine == "pandoc":
+            with stage(self.profile, "render"):
+                content = self._render_markdown(components)
+            with stage(self.profile, "pandoc", len(content)):
+                return convert_text(content, "html", "markdown")
+        with stage(self.profile, "render"):
+            return "\n".join([self._render_component(c, "html") for c in components]) + "\n"
+
+    def _render_document(self, components):
+        return self._render_html(components)
 
     def _relocate_image_files(self, dest, report):
-        # make a copy of report with no component
-        out_report = deepcopy(report)
-        out_report.components = []
-
-        # Iterate through report components, copy plots to new location
-        plots_dir = ifnotexistmkdir(f"{dest.parent}/plots")
-        for component in report.get_components():
+        # Iterate through report components, place plots in new location
+        out_report = ReportView(report)
+        plots_dir = ifnotexistmkdir(f"{Path(dest).parent}/plots")
+        for i, component in _resolved_components(report, out_report):
             if isinstance(component, Plot):
-                new_plot = deepcopy(component)
+                new_plot = copy(component)
                 old_path = component.get_path()
-                new_path = plots_dir / os.path.basename(old_path)
-                copyfile(old_path, new_path)
+                digest = filedigest(old_path) if self.dedupe else None
+                if self.dedupe:
+                    new_path = plots_dir / f"{digest}{Path(old_path).suffix}"
+                else:
+                    new_path = plots_dir / os.path.basename(old_path)
+                relocate_file(old_path, new_path, strategy=self.relocation, digest=digest)
                 new_plot.set_path(new_path)
-                out_report.add_component(new_plot)
-            else:
-                out_report.add_component(component)
+                out_report.substitute(i, new_plot)
+        return out_report
+
+    def _embed_image_files(self, report):
+        # Swap plot paths for data URIs, encoding all images in one batch
+        out_report = ReportView(report)
+        plots = {}
+        for i, component in _resolved_components(report, out_report):
+            if isinstance(component, Plot):
+                plots[i] = component
+        uris = encode_images([plot.get_path() for plot in plots.values()],
+                             max_size=self.image_max_size, workers=self.image_workers,
+                             cache=self.image_cache)
+        for (i, plot), uri in zip(plots.items(), uris):
+            new_plot = copy(plot)
+            new_plot.set_path(uri)
+            out_report.substitute(i, new_plot)
         return out_report
 
 
-class PDFRenderer():
+class PDFRenderer(MarkdownRenderer):
     """Renderer that converts Report to PDF via Markdown
+
+    The markdown is piped to pandoc over stdin. `engine` selects pandoc's PDF
+    engine, a LaTeX engine ("pdflatex", "xelatex", "lualatex", "tectonic") or
+    an HTML based one ("weasyprint", "wkhtmltopdf"). With `cache_dir`, TeX's
+    font and format caches are kept there and reused across runs.
     """
+    def __init__(self, cache=None, engine="pdflatex", cache_dir=None, profile=None):
+        super().__init__(cache=cache, profile=profile)
+        self.engine = engine
+        self.cache_dir = cache_dir
+
     def save(self, report, dest):
         """Save report to destination
         """
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            filepath = f"{tmpdirname}/temp.md"
-            MarkdownRenderer().save(report, filepath)
-            print(filepath, dest)
-            pypandoc.convert_file(filepath, "pdf", outputfile=str(dest))
+        with stage(self.profile, "render"):
+            content = self._render_markdown(report.get_components())
+        with stage(self.profile, "pandoc", len(content)):
+            self.convert(content, dest)
+
+    def convert(self, content, dest):
+        """Convert markdown content to a PDF at destination
+        """
+        import pypandoc  # pylint: disable=import-outside-toplevel
+
+        command = [pypandoc.get_pandoc_path(), "--from", "markdown", "--output", str(dest),
+                   f"--pdf-engine={self.engine}"]
+        env = None
+        if self.cache_dir is not None:
+            cache_dir = str(ifnotexistmkdir(self.cache_dir).resolve())
+            env = dict(os.environ, TEXMFVAR=cache_dir, TECTONIC_CACHE_DIR=cache_dir)
+        result = subprocess.run(command, input=content.encode(), capture_output=True,
+                                env=env, check=False)
+        if result.returncode:
+            raise RuntimeError(f'Pandoc died with exitcode "{result.returncode}" during '
+                               f'conversion: {result.stderr.decode(errors="replace")}')
 
 
 # class ConfluenceAPIError(Exception):
@@ -96,17 +339,52 @@ class PDFRenderer():
 
 class ConfluenceRenderer(MarkdownRenderer):
     """Render report to comfluence via the atlassian API
+
+    Plots are uploaded concurrently by `upload_workers` threads sharing one
+    keep-alive session. Uploads failing with a connection error, 429 or 5xx
+    are retried up to `retries` times, waiting `backoff * 2 ** attempt` seconds.
+
+    With `update=True` an existing page of the same title in the space is
+    updated in place. Hashes of the wiki content and each plot are kept in a
+    page property, so only changed content and plots are re-published.
+
+    With a `Paginator` as `paginate` the report is published as an index page
+    with a child page per report page, created in parallel. Paginated reports
+    are always published as new pages. With a `TableOffload` as `offload`
+    large tables are attached to the page with the plots, linked from a
+    preview in their place.
     """
-    def __init__(self, space="", url="", username="", token="", parent=None):
+    manifest_key = "ouroboreport"
+
+    def __init__(self, space="", url="", username="", token="", parent=None, cache=None,
+                 upload_workers=4, retries=3, backoff=0.5, update=False, profile=None,
+                 paginate=None, offload=None):
+        # pylint: disable=import-outside-toplevel
+        import requests
+        from atlassian import Confluence
+
+        if update and paginate is not None:
+            raise ValueError("Paginated reports cannot be updated in place")
+        super().__init__(cache=cache, profile=profile, paginate=paginate, offload=offload)
         self.parent = parent
         self.space = space
+        self.update = update
+        self.upload_workers = upload_workers
+        self.retries = retries
+        self.backoff = backoff
 
         # if not all([space, url, username, token]):
         #     raise ConfluenceAPIError("Must assigne a space, url, unername and token")
 
+        # Pool one connection per upload worker so concurrent uploads keep-alive
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(upload_workers, 1))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
         # Define atlassian api connection
-        self.conn = Confluence(url=url, username=username,
-                               password=token, cloud=True)
+        self.conn = Confluence(url=url, username=username, password=token,
+                               cloud=True, session=session)
 
     def set_parent(self, parent):
         """Set id of parent to write conluence page to
@@ -121,23 +399,107 @@ class ConfluenceRenderer(MarkdownRenderer):
     def save(self, report):
         """Save report to Confluence
         """
-        report, plots_to_upload = self._process_images(report)
+        if self.offload is None:
+            self._publish(report, [])
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            report, sidecars = self._offload_tables(report, directory, attachment=True)
+            self._publish(report, sidecars)
+
+    def _publish(self, report, attachments):
+        """Publish report to Confluence, uploading attachments with its plots
+        """
+        if self.paginate is not None:
+            self._save_pages_to_confluence(report, attachments)
+            return
+        with stage(self.profile, "process_images"):
+            report, plots_to_upload = self._process_images(report)
+        plots_to_upload += attachments
         content = self._convert_to_jira_wiki(report)
-        response = self.conn.create_page(self.space, report.title, content, type="page",
-                                         representation="wiki", parent_id=self.parent)
-        page_id = response['id']
+        if not self.update:
+            with stage(self.profile, "http", len(content)):
+                response = self.conn.create_page(self.space, report.title, content, type="page",
+                                                 representation="wiki", parent_id=self.parent)
+            self._upload_images(plots_to_upload, response['id'])
+            return
+
+        # Single read of the page and its manifest, then write only what changed
+        expand = f"version,metadata.properties.{self.manifest_key}"
+        with stage(self.profile, "http"):
+            page = self.conn.get_page_by_title(self.space, report.title, expand=expand)
+        manifest = {"content": textdigest(content),
+                    "attachments": {name: filedigest(path) for path, name in plots_to_upload}}
+        if page is None:
+            with stage(self.profile, "http", len(content)):
+                page = self.conn.create_page(self.space, report.title, content, type="page",
+                                             representation="wiki", parent_id=self.parent)
+            previous = None
+        else:
+            previous = page.get("metadata", {}).get("properties", {}).get(self.manifest_key)
+            if manifest["content"] != _manifest_value(previous).get("content"):
+                with stage(self.profile, "http", len(content)):
+                    self.conn.update_page(page["id"], report.title, content, type="page",
+                                          representation="wiki", parent_id=self.parent)
+
+        uploaded = _manifest_value(previous).get("attachments", {})
+        changed = [(path, name) for path, name in plots_to_upload
+                   if uploaded.get(name) != manifest["attachments"][name]]
+        self._upload_images(changed, page["id"])
+        if manifest != _manifest_value(previous):
+            self._save_manifest(page["id"], manifest, previous)
+
+    def _save_pages_to_confluence(self, report, attachments):
+        """Publish an index page linking to a child page per report page
+
+        Each attachment is uploaded to the page whose table preview links to it.
+        """
+        pages = self.paginate.pages(report)
+        titles = [f"{report.title} - {page.number}. {page.title}" for page in pages]
+        index = "".join(f"* [{escape('jira', title)}]\n" for title in titles)
+        with stage(self.profile, "http", len(index)):
+            response = self.conn.create_page(self.space, report.title, index, type="page",
+                                             representation="wiki", parent_id=self.parent)
+
+        def save_page(i):
+            page, plots_to_upload = self._process_images(pages[i])
+            linked = {component.filepath for component in page.get_components()
+                      if isinstance(component, TablePreview) and component.attachment}
+            plots_to_upload += [(path, name) for path, name in attachments if name in linked]
+            content = self._convert_to_jira_wiki(page)
+            with stage(self.profile, "http", len(content)):
+                child = self.conn.create_page(self.space, titles[i], content, type="page",
+                                              representation="wiki", parent_id=response["id"])
+            self._upload_images(plots_to_upload, child["id"])
+
+        with ThreadPoolExecutor(max_workers=self.paginate.workers) as pool:
+            list(pool.map(save_page, range(len(pages))))
+
+    def _save_manifest(self, page_id, manifest, previous):
+        """Store content hashes in the page property, creating it if needed
+        """
+        data = {"key": self.manifest_key, "value": manifest}
+        with stage(self.profile, "http"):
+            if previous is None:
+                self.conn.set_page_property(page_id, data)
+            else:
+                data["version"] = {"number": previous["version"]["number"] + 1}
+                self.conn.update_page_property(page_id, data)
 
-        # upload images
-        for filepath, name in plots_to_upload:
-            self._upload_image(filepath, name, page_id)
+    def _upload_images(self, plots_to_upload, page_id):
+        """Upload images concurrently, raising the first failure once all finish
+        """
+        with ThreadPoolExecutor(max_workers=max(self.upload_workers, 1)) as pool:
+            uploads = [pool.submit(self._upload_image, filepath, name, page_id)
+                       for filepath, name in plots_to_upload]
+        for upload in uploads:
+            upload.result()
 
     def _process_images(self, report):
         """Prepare report and images to be uploaded
         """
-        out_report = deepcopy(report)
-        out_report.components = []
+        out_report = ReportView(report)
         images_to_upload = []
-        for component in report.get_components():
+        for i, component in _resolved_components(report, out_report):
             if isinstance(component, Plot):
                 # prepare upload
                 filepath = component.get_path()
@@ -145,18 +507,27 @@ class ConfluenceRenderer(MarkdownRenderer):
                 images_to_upload.append((filepath, name))
 
                 # Change Plot to match
-                new_plot = deepcopy(component)
+                new_plot = copy(component)
                 new_plot.set_path(name)
-                out_report.add_component(new_plot)
-            else:
-                out_report.add_component(component)
+                out_report.substitute(i, new_plot)
         return out_report, images_to_upload
 
-
     def _upload_image(self, filepath, name, page_id):
-        """Upload Iamges to Confluence
+        """Upload Iamges to Confluence, retrying transient failures with backoff
         """
-        self.conn.attach_file(filepath, space=self.space, page_id=page_id, name=name)
+        import requests  # pylint: disable=import-outside-toplevel
+
+        nbytes = os.path.getsize(filepath) if self.profile is not None else 0
+        for attempt in range(self.retries + 1):
+            try:
+                with stage(self.profile, "upload", nbytes):
+                    return self.conn.attach_file(filepath, space=self.space, page_id=page_id,
+                                                 name=name)
+            except requests.RequestException as err:
+                if attempt == self.retries or not _is_transient(err):
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+        return None
 
     def _test_connection(self):
         """Test initialized confluence connection
@@ -169,6 +540,35 @@ class ConfluenceRenderer(MarkdownRenderer):
     def _convert_to_jira_wiki(self, report):
         """Convert Markdown content to Atlassian wiki markup
         """
-        content = self._render_markdown(report.get_components())
-        content = pypandoc.convert_text(content, "jira", "markdown")
-        return content
+        with stage(self.profile, "render"):
+            content = self._render_markdown(report.get_components())
+        with stage(self.profile, "pandoc", len(content)):
+            return convert_text(content, "jira", "markdown")
+
+
+def _resolved_components(report, out_report):
+    """Yield position and component of report, resolving Lazy ones that may compute a plot
+
+    Resolved components are substituted in `out_report`, so rendering it does
+    not compute them again. Lazy components wrapping another type are left
+    for rendering.
+    """
+    for i, component in enumerate(report.get_components()):
+        if isinstance(component, Lazy) and component.wrapper in (None, Plot):
+            component = component.resolve()
+            out_report.substitute(i, component)
+        yield i, component
+
+
+def _manifest_value(prop):
+    """Get manifest from page property, empty if there is none
+    """
+    return prop["value"] if prop else {}
+
+
+def _is_transient(err):
+    """Test if a failed request is worth retrying
+    """
+    if err.response is None:
+        return True
+    return err.response.status_code == 429 or err.response.status_code >= 500
@@ -1,5 +1,6 @@
 """Report Obect
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from ouroboreport.renderers import ConfluenceRenderer
@@ -7,11 +8,23 @@ from ouroboreport.renderers import MarkdownRenderer
 from ouroboreport.renderers import HTMLRenderer
 from ouroboreport.renderers import PDFRenderer
 from ouroboreport.components import Header
+from ouroboreport.components import Lazy
 from ouroboreport.components import Paragraph
 from ouroboreport.components import UnorderedList
 from ouroboreport.components import OrderedList
 from ouroboreport.components import CheckboxList
 from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.manifest import split_sections
+from ouroboreport.cache import RenderCache
+from ouroboreport.images import ImageCache
+from ouroboreport.profiling import RenderProfile
+from ouroboreport.profiling import stage
+from ouroboreport.shared import isfilelike
+from ouroboreport.segment import Segment
+from ouroboreport.segment import SegmentChain
+from ouroboreport.segment import write_segment
+from ouroboreport.store import ComponentStore
 
 
 DEFAULT_TITLE = "Ouroboreport"
@@ -19,10 +32,21 @@ DEFAULT_TITLE = "Ouroboreport"
 
 class Report():
     """Report
+
+    Rendered component output is memoized in a `RenderCache` of `cache_size`
+    entries shared by all `save_*` calls, set `cache_size=0` to disable it.
+    With `compact` components are packed into a `ComponentStore`, which uses
+    far less memory for reports of very many text components.
+
+    After `enable_profiling` every save records stage and component timings,
+    available from `get_profile`.
     """
-    def __init__(self, title="", author=""):
-        self.components = []
+    def __init__(self, title="", author="", cache_size=1024, compact=False):
+        self.components = ComponentStore() if compact else []
         self.author = author
+        self.render_cache = RenderCache(maxsize=cache_size)
+        self.image_cache = ImageCache()
+        self.profile = None
 
         if not title:
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -31,18 +55,128 @@ class Report():
         self.title = title
 
     def __add__(self, other):
-        """Add to Reports together
+        """Add to Reports together, keeping title and author of the first
+        """
+        return Report.merge(self, other)
+
+    def __iadd__(self, other):
+        """Append components of another Report in place
+        """
+        self.extend_components(other.components)
+        return self
+
+    @classmethod
+    def merge(cls, *reports, title=None, author=None):
+        """Merge reports into a new Report in a single pass over their components
+
+        Components are shared with the merged reports rather than copied. Title,
+        author and compact storage default to those of the first report.
+        """
+        first = reports[0] if reports else Report()
+        merged = cls(title=first.title if title is None else title,
+                     author=first.author if author is None else author,
+                     cache_size=first.render_cache.maxsize,
+                     compact=isinstance(first.components, ComponentStore))
+        if isinstance(first.components, SegmentChain):
+            merged.components = SegmentChain()
+        for report in reports:
+            merged.extend_components(report.components)
+        return merged
+
+    @classmethod
+    def from_segments(cls, *directories, title=None, author=None, allow_pickle=False):
+        """Assemble a Report from segments written by `save_segment`
+
+        Segments are linked by reference and their tables read only while
+        rendering, so reports far larger than memory can be streamed to any
+        format. Title and author default to those of the first segment.
+        Components of types other than the built-in ones are stored pickled,
+        and reading them needs `allow_pickle`, which can run arbitrary code
+        from the segment: only set it for directories you trust.
+        """
+        segments = [Segment(directory, allow_pickle=allow_pickle) for directory in directories]
+        first = segments[0] if segments else Report()
+        report = cls(title=first.title if title is None else title,
+                     author=first.author if author is None else author)
+        report.components = SegmentChain(segments)
+        return report
+
+    def save_segment(self, directory):
+        """Write components to a segment directory for `Report.from_segments`
+
+        Meant for worker processes, which can return the directory instead of
+        pickling the Report back to the parent. Tables are stored as Parquet.
+        """
+        return write_segment(self.components, directory, title=self.title, author=self.author)
+
+    def dump(self, directory, images="content"):
+        """Save Report to a directory it can be loaded from to render again later
+
+        Plot files are copied in, named by content hash, unless `images` is
+        "reference", which keeps their current paths.
+        """
+        return write_segment(self.components, directory, title=self.title, author=self.author,
+                             images=images)
+
+    @classmethod
+    def load(cls, directory, allow_pickle=False):
+        """Open a Report saved with `dump`, reading components only as they are rendered
+
+        As for `from_segments`, only set `allow_pickle` for directories you trust.
+        """
+        return cls.from_segments(directory, allow_pickle=allow_pickle)
+
+    def extend_components(self, components):
+        """Add each of components to report
+        """
+        self.components.extend(components)
+
+    def cache_info(self):
+        """Get render cache hits, misses, maxsize and current size
+        """
+        return self.render_cache.info()
+
+    def enable_profiling(self, callback=None, logger=None):
+        """Record timings of following saves, emitting a summary after each save
+
+        The summary dict of `get_profile` is passed to `callback` and/or logged
+        to `logger` at INFO level.
+        """
+        self.profile = RenderProfile(callback=callback, logger=logger)
+        return self.profile
+
+    def disable_profiling(self):
+        """Stop recording timings
         """
-        merged_components = self.components + other.components
-        new_report = Report()
-        new_report.components = merged_components
-        return new_report
+        self.profile = None
+
+    def get_profile(self):
+        """Get recorded stage and component timings with render cache counters
+        """
+        if self.profile is None:
+            return None
+        summary = self.profile.to_dict()
+        summary["cache"] = self.cache_info()._asdict()
+        return summary
+
+    def _profiled_save(self, fmt, renderer, *args):
+        """Save with `renderer`, timing the whole save and emitting the profile
+        """
+        with stage(self.profile, f"save_{fmt}"):
+            renderer.save(self, *args)
+        if self.profile is not None:
+            self.profile.emit({"cache": self.cache_info()._asdict()})
 
     def get_components(self):
         """Get list of Report components
         """
         return self.components
 
+    def get_sections(self):
+        """Get components split into sections, each starting at a Header
+        """
+        return split_sections(self.get_components())
+
     def add_component(self, component):
         """Add component to report
         """
@@ -88,40 +222,149 @@ class Report():
         """
         self.add_component(CheckboxList(content))
 
-    def add_table(self, df):
+    def add_table(self, df, max_rows=None, max_cols=None, precision=None,
+                  index=True, copy=True):
         """Add table from pandas dataframe to report
         """
-        self.add_component(df)
+        self.add_component(Table(df, max_rows=max_rows, max_cols=max_cols,
+                                 precision=precision, index=index, copy=copy))
 
     def add_plot(self, filepath,  title="", alttxt=""):
         """Add plot to report
         """
         self.add_component(Plot(filepath, title=title, alttxt=alttxt))
 
-    def save_markdown(self, destination):
-        """Save Report to markdown format
+    def add_lazy(self, factory, memoize=True):
+        """Add component returned by `factory` when the report is first rendered
         """
-        destination = Path(destination)
-        renderer = MarkdownRenderer()
-        renderer.save(self, destination)
+        self.add_component(Lazy(factory, memoize=memoize))
+
+    def add_lazy_table(self, factory, max_rows=None, max_cols=None, precision=None,
+                       index=True, memoize=True):
+        """Add table from dataframe returned by `factory` when first rendered
+        """
+        self.add_component(Lazy(factory, Table, memoize=memoize, max_rows=max_rows,
+                                max_cols=max_cols, precision=precision, index=index,
+                                copy=False))
+
+    def add_lazy_plot(self, factory, title="", alttxt="", memoize=True):
+        """Add plot from file path returned by `factory` when first rendered
+        """
+        self.add_component(Lazy(factory, Plot, memoize=memoize, title=title, alttxt=alttxt))
+
+    def save_markdown(self, destination, incremental=False, paginate=None, offload=None):
+        """Save Report to markdown format at a path or writable file-like object
+
+        With `incremental` only sections changed since the last incremental save
+        to the same path are re-rendered. With a `Paginator` as `paginate`
+        each page is saved to its own file, linked from an index at destination.
+        With a `TableOffload` as `offload` large tables are written to files in
+        a `tables` directory next to destination and previewed in the report.
+        """
+        if not isfilelike(destination):
+            destination = Path(destination)
+        renderer = MarkdownRenderer(cache=self.render_cache, incremental=incremental,
+                                    profile=self.profile, paginate=paginate, offload=offload)
+        self._profiled_save("markdown", renderer, destination)
 
-    def save_html(self, destination, cp_img_to_path=False):
+    def save_html(self, destination, cp_img_to_path=False, engine="native",
+                  relocation="copy", dedupe=False, incremental=False, embed_images=False,
+                  image_max_size=None, image_workers=None, paginate=None, offload=None):
         """Save Report to html format
+
+        With `embed_images` plots are embedded as data URIs, downscaled to fit
+        `image_max_size` pixels if given, so the HTML file is self-contained.
+        `paginate` splits the report into linked pages and `offload` moves large
+        tables to linked files as in `save_markdown`.
         """
         destination = Path(destination)
-        renderer = HTMLRenderer(cp_img_to_path=cp_img_to_path)
-        renderer.save(self, destination)
+        renderer = HTMLRenderer(cp_img_to_path=cp_img_to_path, engine=engine,
+                                cache=self.render_cache, relocation=relocation,
+                                dedupe=dedupe, incremental=incremental,
+                                profile=self.profile, embed_images=embed_images,
+                                image_max_size=image_max_size, image_workers=image_workers,
+                                image_cache=self.image_cache, paginate=paginate,
+                                offload=offload)
+        self._profiled_save("html", renderer, destination)
 
-    def save_pdf(self, destination):
+    def save_pdf(self, destination, engine="pdflatex", cache_dir=None):
         """Save Report to pdf format
         """
         destination = Path(destination)
-        renderer = PDFRenderer()
-        renderer.save(self, destination)
+        renderer = PDFRenderer(cache=self.render_cache, engine=engine, cache_dir=cache_dir,
+                               profile=self.profile)
+        self._profiled_save("pdf", renderer, destination)
+
+    def save_confluence(self, space=None, url=None, username=None, token=None, parent=None,
+                        upload_workers=4, update=False, paginate=None, offload=None):
+        """Save Report to to_confluence format, updating an existing page if `update`
 
-    def save_confluence(self, space=None, url=None, username=None, token=None, parent=None):
-        """Save Report to to_confluence format
+        With a `Paginator` as `paginate` pages are published as children of an
+        index page. With a `TableOffload` as `offload` large tables are attached
+        to the page and previewed in it.
         """
         renderer = ConfluenceRenderer(space=space, url=url, username=username,
-                                      token=token, parent=parent)
-        renderer.save(self)
+                                      token=token, parent=parent, cache=self.render_cache,
+                                      upload_workers=upload_workers, update=update,
+                                      profile=self.profile, paginate=paginate,
+                                      offload=offload)
+        self._profiled_save("confluence", renderer)
+
+    def save_all(self, destinations, max_workers=None):
+        """Save Report to several formats concurrently
+
+        `destinations` maps a format ("markdown", "html", "pdf" or "confluence")
+        to the destination for the matching `save_*` method, or to a dict of its
+        keyword arguments. Components are rendered once per output format into
+        the render cache, then each export runs in its own thread so pandoc and
+        HTTP calls overlap. The first export error is raised once all finish.
+        """
+        savers = {"markdown": self.save_markdown, "html": self.save_html,
+                  "pdf": self.save_pdf, "confluence": self.save_confluence}
+        unknown = set(destinations) - set(savers)
+        if unknown:
+            raise ValueError(f"Unknown formats {sorted(unknown)}, expected any of {list(savers)}")
+
+        requests = {fmt: dest if isinstance(dest, dict) else {"destination": dest}
+                    for fmt, dest in destinations.items()}
+        self._warm_render_cache(requests)
+        with ThreadPoolExecutor(max_workers=max_workers or len(requests) or 1) as pool:
+            futures = [pool.submit(savers[fmt], **kwargs) for fmt, kwargs in requests.items()]
+        for future in futures:
+            future.result()
+
+    def _warm_render_cache(self, requests):
+        """Render each cacheable component once per format needed by `requests`
+
+        Components without a digest would not be stored, so they are left for
+        the renderers instead of being rendered twice. Neither are components
+        every export of a format replaces before rendering, such as tables
+        offloaded to files or plots relocated or embedded.
+        """
+        if len(self.components) > self.render_cache.maxsize:
+            return
+        formats = {}
+        for fmt, kwargs in requests.items():
+            native_html = fmt == "html" and kwargs.get("engine", "native") == "native"
+            formats.setdefault("html" if native_html else "markdown", []).append(kwargs)
+        for component in self.components:
+            digest = component.digest() if hasattr(component, "digest") else None
+            if digest is None:
+                continue
+            for fmt, exports in sorted(formats.items()):
+                if all(_replaced_on_save(component, kwargs) for kwargs in exports):
+                    continue
+                self.render_cache.render(component, fmt, digest=digest)
+
+
+def _replaced_on_save(component, kwargs):
+    """Test whether a save with keyword arguments `kwargs` replaces component
+
+    Offloaded tables are rendered as previews, and relocated or embedded
+    plots with new paths, so their cached output would never be used.
+    """
+    offload = kwargs.get("offload")
+    if offload is not None and offload.table(component) is not None:
+        return True
+    relocated = kwargs.get("cp_img_to_path") or kwargs.get("embed_images")
+    return isinstance(component, Plot) and bool(relocated)
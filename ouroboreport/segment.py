@@ -0,0 +1,306 @@
+"""Report components written to disk as compact, versioned segments
+
+A segment is the on-disk form of a report. Worker processes save theirs with
+`write_segment` instead of pickling them back to the parent, and any report
+can be saved and re-rendered later without re-running the analysis.
+
+A segment directory holds `index.json` with the format version, title,
+author and component count, `components.jsonl` with one entry per text
+component or plot, one Parquet file per table (needs pyarrow) and a pickle
+per component of any other type, or per table Parquet cannot store. Plots are referenced by path, or stored
+content-addressed under `images/`. Segments are read lazily: opening one
+reads only the small index, components are decoded while iterating and
+tables are memory-mapped when they are rendered.
+
+Unpickling can run arbitrary code, so pickled components are only read from
+segments opened with `allow_pickle=True`, for directories you trust.
+"""
+import json
+import pickle
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from itertools import chain
+from pathlib import Path
+
+from ouroboreport.components import CheckboxList
+from ouroboreport.components import Header
+from ouroboreport.components import Lazy
+from ouroboreport.components import OrderedList
+from ouroboreport.components import Paragraph
+from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.components import UnorderedList
+from ouroboreport.shared import filedigest
+from ouroboreport.shared import ifnotexistmkdir
+from ouroboreport.shared import relocate_file
+
+
+SEGMENT_VERSION = 1
+INDEX_NAME = "index.json"
+COMPONENTS_NAME = "components.jsonl"
+IMAGES_DIR = "images"
+IMAGE_MODES = ("reference", "content")
+LIST_TYPES = {cls.__name__: cls for cls in (UnorderedList, OrderedList, CheckboxList)}
+
+
+def write_segment(components, directory, title="", author="", images="reference"):
+    """Write components to a segment directory, returning its path
+
+    Lazy components are resolved first, so the segment holds their results.
+    With `images="content"` plot files are copied into the segment, named by
+    content hash, instead of referenced by their absolute path.
+    """
+    if images not in IMAGE_MODES:
+        raise ValueError(f"Unknown images mode '{images}', expected one of {IMAGE_MODES}")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    length = 0
+    with open(directory / COMPONENTS_NAME, "w", encoding="utf-8") as out:
+        for position, component in enumerate(components):
+            out.write(json.dumps(_encode(component, directory, position, images)) + "\n")
+            length += 1
+    index = {"version": SEGMENT_VERSION, "title": title, "author": author, "length": length}
+    (directory / INDEX_NAME).write_text(json.dumps(index))
+    return directory
+
+
+def _encode(component, directory, position, images):
+    """Entry of one component, writing images, tables and other objects to files
+    """
+    if isinstance(component, Lazy):
+        component = component.resolve()
+    cls = type(component)
+    if cls is Header:
+        return {"type": "Header", "content": str(component.content), "level": component.level}
+    if cls is Paragraph:
+        return {"type": "Paragraph", "content": str(component.content)}
+    if cls in LIST_TYPES.values():
+        return {"type": cls.__name__, "content": list(map(str, component.content))}
+    if cls is Plot:
+        entry = {"type": "Plot", "filepath": str(component.get_path().resolve()),
+                 "title": component.title, "alttxt": component.alttxt}
+        if images == "content":
+            path = component.get_path()
+            digest = filedigest(path)
+            name = f"{digest}{path.suffix}"
+            relocate_file(path, ifnotexistmkdir(directory / IMAGES_DIR) / name, digest=digest)
+            entry.update(filepath=f"{IMAGES_DIR}/{name}", stored=True)
+        return entry
+    if cls is Table:
+        filename = f"table{position}.parquet"
+        df = component.content
+        frame = df.set_axis([f"c{i}" for i in range(df.shape[1])], axis=1)
+        try:
+            frame.to_parquet(directory / filename, index=True)
+        except (ValueError, TypeError, NotImplementedError):
+            # Parquet needs one type per column, e.g. not [1, "x"]: pickle the table instead
+            (directory / filename).unlink(missing_ok=True)
+            return _pickle_entry(component, directory, position)
+        return {"type": "Table", "file": filename, "columns": _labels(df.columns),
+                "column_names": _labels(df.columns.names), "shape": list(df.shape), "max_rows": component.max_rows,
+                "max_cols": component.max_cols, "precision": component.precision,
+                "index": component.index}
+    return _pickle_entry(component, directory, position)
+
+
+def _pickle_entry(component, directory, position):
+    """Entry of a component pickled to its own file
+    """
+    filename = f"object{position}.pickle"
+    with open(directory / filename, "wb") as out:
+        pickle.dump(component, out, protocol=pickle.HIGHEST_PROTOCOL)
+    return {"type": "pickle", "file": filename}
+
+
+def _labels(values):
+    """Labels as JSON values, stringified if they are not JSON serializable
+
+    MultiIndex labels are tuples, written as lists of their level values.
+    """
+    labels = list(values)
+    try:
+        json.dumps(labels)
+    except TypeError:
+        labels = [list(map(str, label)) if isinstance(label, tuple) else str(label)
+                  for label in labels]
+    return labels
+
+
+class TableFile():
+    """Factory of a segment table, knowing its `shape` before reading it
+    """
+    def __init__(self, path, columns, shape, names=None):
+        self.path = path
+        self.columns = columns
+        self.shape = tuple(shape)
+        self.names = names or [None]
+
+    def __call__(self):
+        """Memory-map the table and restore its original column labels
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        df = pd.read_parquet(self.path, memory_map=True)
+        if not self.columns:
+            return df
+        if len(self.names) > 1:
+            df.columns = pd.MultiIndex.from_tuples(map(tuple, self.columns), names=self.names)
+        else:
+            df.columns = pd.Index(self.columns, name=self.names[0])
+        return df
+
+
+class Segment():
+    """Sequence of the components of a segment directory
+
+    Only `index.json` is read on first use. Iterating streams the component
+    entries from disk, and indexing seeks to an entry by its byte offset.
+    Tables come back as `Lazy` components reading their Parquet file each
+    time they are rendered, so rendering a large segment never holds all of
+    its tables in memory. Reading a pickled component raises a ValueError
+    unless `allow_pickle` is set.
+    """
+    def __init__(self, directory, allow_pickle=False):
+        self.directory = Path(directory)
+        self.allow_pickle = allow_pickle
+        self._index = None
+        self._offsets = None
+
+    @property
+    def index(self):
+        """Parsed `index.json` of the segment
+        """
+        if self._index is None:
+            index = json.loads((self.directory / INDEX_NAME).read_text())
+            if index.get("version") != SEGMENT_VERSION:
+                raise ValueError(f"Unsupported segment version {index.get('version')} "
+                                 f"in {self.directory}, expected {SEGMENT_VERSION}")
+            self._index = index
+        return self._index
+
+    @property
+    def title(self):
+        """Title of the report the segment was written from
+        """
+        return self.index["title"]
+
+    @property
+    def author(self):
+        """Author of the report the segment was written from
+        """
+        return self.index["author"]
+
+    def __len__(self):
+        return self.index["length"]
+
+    def __iter__(self):
+        if not self:
+            return
+        with open(self.directory / COMPONENTS_NAME, "rb") as infile:
+            for line in infile:
+                yield self._decode(json.loads(line))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("component index out of range")
+        with open(self.directory / COMPONENTS_NAME, "rb") as infile:
+            infile.seek(self._line_offsets()[index])
+            return self._decode(json.loads(infile.readline()))
+
+    def _line_offsets(self):
+        """Byte offset of each component entry, scanned once
+        """
+        if self._offsets is None:
+            offsets = array("Q")
+            position = 0
+            with open(self.directory / COMPONENTS_NAME, "rb") as infile:
+                for line in infile:
+                    offsets.append(position)
+                    position += len(line)
+            self._offsets = offsets
+        return self._offsets
+
+    def _decode(self, entry):
+        kind = entry["type"]
+        if kind == "Header":
+            return Header(entry["content"], entry["level"])
+        if kind == "Paragraph":
+            return Paragraph(entry["content"])
+        if kind in LIST_TYPES:
+            return LIST_TYPES[kind](entry["content"])
+        if kind == "Plot":
+            filepath = entry["filepath"]
+            if entry.get("stored"):
+                filepath = self.directory / filepath
+            return Plot(filepath, title=entry["title"], alttxt=entry["alttxt"])
+        if kind == "Table":
+            factory = TableFile(self.directory / entry["file"], entry["columns"], entry["shape"],
+                                entry.get("column_names"))
+            return Lazy(factory, Table, memoize=False, max_rows=entry["max_rows"],
+                        max_cols=entry["max_cols"], precision=entry["precision"],
+                        index=entry["index"], copy=False)
+        if not self.allow_pickle:
+            raise ValueError(f"Segment {self.directory} holds a pickled component, only "
+                             "load it with allow_pickle=True if you trust its source")
+        with open(self.directory / entry["file"], "rb") as infile:
+            return pickle.load(infile)
+
+
+class SegmentChain():
+    """List-like concatenation of segments and in-memory components by reference
+
+    Segments and other chains are linked rather than loaded when extending,
+    any other components are appended to an in-memory tail.
+    """
+    def __init__(self, parts=()):
+        self._parts = []
+        for part in parts:
+            self.extend(part)
+
+    def __len__(self):
+        return sum(map(len, self._parts))
+
+    def __iter__(self):
+        return chain.from_iterable(self._parts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("component index out of range")
+        ends = list(accumulate(map(len, self._parts)))
+        part = bisect_right(ends, index)
+        return self._parts[part][index - (ends[part - 1] if part else 0)]
+
+    @property
+    def segments(self):
+        """Segments linked into the chain
+        """
+        return [part for part in self._parts if isinstance(part, Segment)]
+
+    def append(self, component):
+        """Add a component to the in-memory tail
+        """
+        if not self._parts or not isinstance(self._parts[-1], list):
+            self._parts.append([])
+        self._parts[-1].append(component)
+
+    def extend(self, components):
+        """Link segments and chains, append any other components
+        """
+        if isinstance(components, Segment):
+            self._parts.append(components)
+        elif isinstance(components, SegmentChain):
+            for part in components._parts:  # pylint: disable=protected-access
+                self.extend(part)
+        else:
+            for component in components:
+                self.append(component)
@@ -1,13 +1,134 @@
 """Shared functions and utilities
 """
+import hashlib
 import os
+import threading
+import uuid
 
 from pathlib import Path
+from shutil import copyfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+RELOCATIONS = ("copy", "hardlink", "reflink", "symlink")
+
+# ioctl request to share a file's extents copy-on-write (Linux btrfs/xfs)
+FICLONE = 0x40049409
+
+
+class LockedState():
+    """Mixin holding a `_lock`, dropped when pickled and made anew when unpickled
+
+    Lets reports holding thread-safe caches and profiles be copied and pickled.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
 
 def ifnotexistmkdir(directory):
     """If given directory path doesn't exist make it
     """
-    if not os.path.exists(directory):
+    try:
         os.mkdir(directory)
+    except FileExistsError:
+        pass
     return Path(directory)
+
+
+def isfilelike(obj):
+    """Test if object is a writable file-like object rather than a path
+    """
+    return hasattr(obj, "write") and not isinstance(obj, (str, os.PathLike))
+
+
+def filedigest(filepath, chunk_size=1 << 20):
+    """Hex digest of a file's content, read in chunks
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as infile:
+        for chunk in iter(lambda: infile.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def textdigest(text):
+    """Hex digest of a string
+    """
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def relocate_file(src, dest, strategy="copy", digest=None):
+    """Place file `src` at `dest` by copying or linking it
+
+    "hardlink" and "reflink" fall back to a copy where the filesystem does not
+    support them. Nothing is written if `dest` already holds the same content.
+    Pass the `digest` of `src` if it is already known to skip hashing it again.
+    The file is placed under a temporary name and moved onto `dest`, so saves
+    relocating to the same destination concurrently do not collide.
+    """
+    src, dest = Path(src), Path(dest)
+    if _samecontent(src, dest, digest):
+        return dest
+
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        _place(src, tmp, strategy)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+    return dest
+
+
+def _place(src, dest, strategy):
+    """Copy or link `src` to the new path `dest`
+    """
+    if strategy == "symlink":
+        os.symlink(src.resolve(), dest)
+    elif strategy == "hardlink":
+        try:
+            os.link(src, dest)
+        except OSError:
+            copyfile(src, dest)
+    elif strategy == "reflink":
+        try:
+            _reflink(src, dest)
+        except OSError:
+            copyfile(src, dest)
+    else:
+        copyfile(src, dest)
+
+
+def _samecontent(src, dest, digest=None):
+    """Test if existing `dest` is `src` or a file of identical content
+    """
+    try:
+        if os.path.samefile(src, dest):
+            return True
+        if os.path.getsize(src) != os.path.getsize(dest):
+            return False
+    except FileNotFoundError:
+        return False
+    return (digest or filedigest(src)) == filedigest(dest)
+
+
+def _reflink(src, dest):
+    """Clone `src` to `dest` sharing data blocks, raising OSError if unsupported
+    """
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as infile, open(dest, "wb") as outfile:
+        fcntl.ioctl(outfile.fileno(), FICLONE, infile.fileno())
@@ -0,0 +1,168 @@
+"""Compact columnar storage of report components
+"""
+from array import array
+
+from ouroboreport.components import CheckboxList
+from ouroboreport.components import Header
+from ouroboreport.components import OrderedList
+from ouroboreport.components import Paragraph
+from ouroboreport.components import Plot
+from ouroboreport.components import UnorderedList
+
+
+# Type codes of components stored as strings, 0 is any other object
+OBJECT, HEADER, PARAGRAPH, UNORDERED_LIST, ORDERED_LIST, CHECKBOX_LIST, PLOT = range(7)
+LIST_CODES = {UnorderedList: UNORDERED_LIST, OrderedList: ORDERED_LIST,
+              CheckboxList: CHECKBOX_LIST}
+LIST_TYPES = {code: cls for cls, code in LIST_CODES.items()}
+
+# Terminates each string in the pool, strings containing it are stored as objects
+TERMINATOR = "\0"
+
+# Number of components decoded together when iterating
+BATCH_SIZE = 4096
+
+
+class ComponentStore():
+    """List-like store of components packed into arrays and a shared string pool
+
+    Headers, paragraphs, lists and plots are stored as a type code, a small
+    argument (header level), a string count and the offset of their strings in
+    a shared UTF-8 pool. Any other component is kept as an object by index.
+    Components are rebuilt on access, so list items come back as strings.
+    Iteration decodes the pool in batches of components to keep rendering fast.
+    """
+    def __init__(self, components=()):
+        self._codes = array("B")
+        self._args = array("B")
+        self._counts = array("L")
+        self._offsets = array("Q")
+        self._pool = bytearray()
+        self._objects = {}
+        self.extend(components)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __iter__(self):
+        codes, args, counts, objects = self._codes, self._args, self._counts, self._objects
+        for first in range(0, len(self), BATCH_SIZE):
+            last = min(first + BATCH_SIZE, len(self))
+            strings = self._pool[self._offsets[first]:self._end(last - 1)].decode()
+            strings = strings.split(TERMINATOR)
+            position = 0
+            for index in range(first, last):
+                code = codes[index]
+                if code == HEADER:
+                    yield Header(strings[position], args[index])
+                    position += 1
+                elif code == PARAGRAPH:
+                    yield Paragraph(strings[position])
+                    position += 1
+                elif code == PLOT:
+                    yield Plot(*strings[position:position + 3])
+                    position += 3
+                elif code == OBJECT:
+                    yield objects[index]
+                else:
+                    count = counts[index]
+                    yield LIST_TYPES[code](strings[position:position + count])
+                    position += count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("component index out of range")
+        return self._load(index)
+
+    def __add__(self, other):
+        store = ComponentStore(self)
+        store.extend(other)
+        return store
+
+    def __radd__(self, other):
+        store = ComponentStore(other)
+        store.extend(self)
+        return store
+
+    def append(self, component):
+        """Pack component into the store
+        """
+        cls = type(component)
+        if cls is Header:
+            code, arg, strings = HEADER, component.level, [str(component.content)]
+        elif cls is Paragraph:
+            code, arg, strings = PARAGRAPH, 0, [str(component.content)]
+        elif cls in LIST_CODES:
+            code, arg, strings = LIST_CODES[cls], 0, list(map(str, component.content))
+        elif cls is Plot:
+            code, arg = PLOT, 0
+            strings = [str(component.get_path()), component.title, component.alttxt]
+        else:
+            code, arg, strings = OBJECT, 0, []
+
+        if code == OBJECT or not 0 <= arg < 256 or any(TERMINATOR in s for s in strings):
+            self._objects[len(self._codes)] = component
+            code, arg, strings = OBJECT, 0, []
+        self._codes.append(code)
+        self._args.append(arg)
+        self._counts.append(len(strings))
+        self._offsets.append(len(self._pool))
+        for string in strings:
+            self._pool += string.encode()
+            self._pool += TERMINATOR.encode()
+
+    def extend(self, components):
+        """Pack each of components into the store
+
+        Another store is appended by copying its arrays and pool as they are.
+        """
+        if isinstance(components, ComponentStore):
+            self._extend_store(components)
+            return
+        for component in components:
+            self.append(component)
+
+    def _extend_store(self, other):
+        # pylint: disable=protected-access
+        base, shift = len(self), len(self._pool)
+        offsets = array("Q", [offset + shift for offset in other._offsets])
+        objects = {index + base: obj for index, obj in other._objects.items()}
+        self._codes.extend(other._codes)
+        self._args.extend(other._args)
+        self._counts.extend(other._counts)
+        self._offsets.extend(offsets)
+        self._pool += other._pool if other is not self else bytes(self._pool)
+        self._objects.update(objects)
+
+    def nbytes(self):
+        """Approximate bytes used by the arrays and string pool
+        """
+        arrays = (self._codes, self._args, self._counts, self._offsets)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self._pool)
+
+    def _end(self, index):
+        """Pool offset just past the strings of component `index`
+        """
+        return self._offsets[index + 1] if index + 1 < len(self) else len(self._pool)
+
+    def _load(self, index):
+        code = self._codes[index]
+        if code == OBJECT:
+            return self._objects[index]
+        strings = self._pool[self._offsets[index]:self._end(index)].decode()
+        strings = strings.split(TERMINATOR)[:self._counts[index]]
+        return self._build(code, self._args[index], strings)
+
+    @staticmethod
+    def _build(code, arg, strings):
+        if code == HEADER:
+            return Header(strings[0], arg)
+        if code == PARAGRAPH:
+            return Paragraph(strings[0])
+        if code == PLOT:
+            return Plot(*strings)
+        return LIST_TYPES[code](strings)
@@ -0,0 +1,39 @@
+"""Lightweight views over Report objects
+"""
+
+
+class ReportView():
+    """Copy-on-write view of a report with some components substituted
+
+    Components that are not substituted, and report attributes such as
+    `title`, are shared with the underlying report by reference.
+    """
+    def __init__(self, report, substitutions=None):
+        self.report = report
+        self.substitutions = dict(substitutions or {})
+
+    def __getattr__(self, name):
+        """Read any other attribute from the underlying report
+        """
+        if name == "report":
+            raise AttributeError(name)
+        return getattr(self.report, name)
+
+    @property
+    def components(self):
+        """List of components with substitutions applied
+        """
+        return self.get_components()
+
+    def substitute(self, index, component):
+        """Replace the component at `index` in this view only
+        """
+        self.substitutions[index] = component
+
+    def get_components(self):
+        """Get list of components with substitutions applied
+        """
+        components = self.report.get_components()
+        if not self.substitutions:
+            return components
+        return [self.substitutions.get(i, c) for i, c in enumerate(components)]
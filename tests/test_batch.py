@@ -0,0 +1,55 @@
+import pytest
+
+from ouroboreport.batch import ReportBatch
+from ouroboreport.components import Lazy
+from ouroboreport.components import Paragraph
+from ouroboreport.report import Report
+
+
+@pytest.fixture
+def reports():
+    reports = []
+    for i in range(3):
+        report = Report(title=f"Report {i}")
+        report.add_header1(f"Customer {i}")
+        reports.append(report)
+    return reports
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_report_batch(tmpdir, reports, processes):
+    batch = ReportBatch(workers=2, processes=processes)
+    for i, report in enumerate(reports):
+        batch.add(report, {"markdown": tmpdir / f"{i}.md", "html": tmpdir / f"{i}.html"})
+    results = batch.run()
+
+    assert [(r.report, r.fmt) for r in results] == [
+        (report, fmt) for report in reports for fmt in ("markdown", "html")]
+    assert all(r.error is None and r.seconds >= 0 for r in results)
+    assert (tmpdir / "2.md").read() == "# Customer 2"
+
+
+def test_report_batch_records_errors(tmpdir, reports):
+    batch = ReportBatch()
+    batch.add(reports[0], {"html": {"destination": tmpdir / "0.html", "engine": "fake"}})
+    batch.add(reports[1], {"markdown": tmpdir / "1.md"})
+    results = batch.run()
+    assert isinstance(results[0].error, ValueError)
+    assert results[1].error is None
+    assert (tmpdir / "1.md").read() == "# Customer 1"
+
+
+def test_report_batch_records_unpicklable_reports(tmpdir, reports):
+    reports[0].add_component(Lazy(lambda: Paragraph("unpicklable")))
+    batch = ReportBatch(workers=2, processes=True)
+    batch.add(reports[0], {"markdown": tmpdir / "0.md"})
+    batch.add(reports[1], {"markdown": tmpdir / "1.md"})
+    results = batch.run()
+    assert results[0].error is not None and results[0].seconds is None
+    assert results[1].error is None
+    assert (tmpdir / "1.md").read() == "# Customer 1"
+
+
+def test_report_batch_unknown_format(reports):
+    with pytest.raises(ValueError):
+        ReportBatch().add(reports[0], {"docx": "report.docx"})
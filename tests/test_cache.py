@@ -0,0 +1,80 @@
+import pickle
+
+import pytest
+
+from ouroboreport.cache import RenderCache
+from ouroboreport.components import Header
+from ouroboreport.components import Lazy
+from ouroboreport.components import Paragraph
+
+
+class FakeComponent():
+    def to_markdown(self):
+        return "# TEST"
+
+
+@pytest.fixture
+def cache():
+    return RenderCache(maxsize=2)
+
+
+def test_render_cache_hit(cache):
+    assert cache.render(Header("Head"), "markdown") == "# Head"
+    assert cache.render(Header("Head"), "markdown") == "# Head"
+    assert cache.info() == (1, 1, 2, 1)
+
+
+def test_render_cache_keyed_by_format(cache):
+    cache.render(Header("Head"), "markdown")
+    assert cache.render(Header("Head"), "html") == "<h1>Head</h1>"
+    assert cache.info().misses == 2
+
+
+def test_render_cache_invalidated_by_content(cache):
+    header = Header("Head")
+    cache.render(header, "markdown")
+    header.level = 2
+    assert cache.render(header, "markdown") == "## Head"
+    assert cache.info().hits == 0
+
+
+def test_render_cache_lru_eviction(cache):
+    cache.render(Paragraph("a"), "markdown")
+    cache.render(Paragraph("b"), "markdown")
+    cache.render(Paragraph("a"), "markdown")
+    cache.render(Paragraph("c"), "markdown")
+    assert len(cache) == 2
+    cache.render(Paragraph("a"), "markdown")
+    assert cache.info().hits == 2
+    cache.render(Paragraph("b"), "markdown")
+    assert cache.info().misses == 4
+
+
+def test_render_cache_without_digest(cache):
+    assert cache.render(FakeComponent(), "markdown") == "# TEST"
+    assert cache.info() == (0, 0, 2, 0)
+
+
+def test_render_cache_none_digest(cache):
+    lazy = Lazy(lambda: Header("Head"), memoize=False)
+    assert cache.render(lazy, "markdown") == "# Head"
+    assert cache.info() == (0, 0, 2, 0)
+
+
+def test_render_cache_disabled():
+    cache = RenderCache(maxsize=0)
+    cache.render(Header("Head"), "markdown")
+    assert len(cache) == 0
+
+
+def test_render_cache_clear(cache):
+    cache.render(Header("Head"), "markdown")
+    cache.clear()
+    assert cache.info() == (0, 0, 2, 0)
+
+
+def test_render_cache_pickle(cache):
+    cache.render(Header("Head"), "markdown")
+    restored = pickle.loads(pickle.dumps(cache))
+    assert restored.render(Header("Head"), "markdown") == "# Head"
+    assert restored.info() == (1, 1, 2, 1)
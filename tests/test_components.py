@@ -1,12 +1,17 @@
+import numpy as np
+import pandas as pd
 import pytest
 
 from pathlib import Path
 from ouroboreport.components import Header
+from ouroboreport.components import Lazy
 from ouroboreport.components import Paragraph
 from ouroboreport.components import UnorderedList
 from ouroboreport.components import OrderedList
 from ouroboreport.components import CheckboxList
 from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.components import TablePreview
 
 @pytest.fixture
 def header(request):
@@ -28,6 +33,10 @@ def ol(request):
 def cbl(request):
     return CheckboxList(["item1", "item2"])
 
+@pytest.fixture
+def table(request):
+    return Table(pd.DataFrame({"a": [1, 2, 3], "b": [0.25, 0.5, 0.75], "c": ["x", "y|", "z"]}))
+
 @pytest.fixture
 def plot(request):
     return Plot("test.png", title="title", alttxt="alt")
@@ -40,6 +49,19 @@ def test_component_eq(paragraph):
     assert paragraph != other
 
 
+@pytest.mark.parametrize("component", [
+    Header("Head"), Paragraph("PPP"), UnorderedList([]), OrderedList([]), CheckboxList([]),
+    Plot("test.png"), Table(pd.DataFrame())])
+def test_component_slots(component):
+    assert not hasattr(component, "__dict__")
+
+
+def test_component_digest(paragraph):
+    assert paragraph.digest() == Paragraph("PPP").digest()
+    assert paragraph.digest() != Paragraph("PPPP").digest()
+    assert paragraph.digest() != Header("PPP").digest()
+
+
 def test_list_component_eq(ul):
     other = UnorderedList(["item1", "item2"])
     assert ul == other
@@ -68,6 +90,20 @@ def test_paragraph_to_html(paragraph):
     assert paragraph.to_html() == "<p>PPP</p>"
 
 
+@pytest.mark.parametrize("text, expected", [
+    ("a < b & c", "a &lt; b &amp; c"),
+    ("**bold**, *em* and _em_ in snake_case",
+     "<strong>bold</strong>, <em>em</em> and <em>em</em> in snake_case"),
+    ("[the *docs*](http://x/?a=1&b=_c_)",
+     '<a href="http://x/?a=1&amp;b=_c_">the <em>docs</em></a>'),
+    ("`a<b *c*`", "<code>a&lt;b *c*</code>")])
+def test_paragraph_to_html_inline_markdown(text, expected):
+    assert Paragraph(text).to_html() == f"<p>{expected}</p>"
+    assert Header(text).to_html() == f"<h1>{expected}</h1>"
+    assert UnorderedList([text]).to_html() == f"<ul>\n<li>{expected}</li>\n</ul>"
+    assert OrderedList([text]).to_html() == f"<ol>\n<li>{expected}</li>\n</ol>"
+
+
 def test_paragraph_to_markdown(paragraph):
     assert paragraph.to_markdown() == "PPP\n"
 
@@ -82,6 +118,28 @@ def test_unordered_list_markdown(ul):
     assert ul.to_markdown() == list_string
 
 
+def test_unordered_list_from_generator():
+    ul = UnorderedList(f"item{i}" for i in range(1, 3))
+    assert ul.to_markdown() == "* item1\n* item2\n"
+    assert ul.to_markdown() == "* item1\n* item2\n"
+
+
+def test_unordered_list_from_numpy():
+    ul = UnorderedList(np.arange(1, 3))
+    assert ul.to_html() == "<ul>\n<li>1</li>\n<li>2</li>\n</ul>"
+
+
+def test_empty_unordered_list():
+    ul = UnorderedList([])
+    assert ul.to_markdown() == "\n"
+    assert ul.to_html() == "<ul>\n</ul>"
+
+
+def test_ordered_list_markdown(ol):
+    list_string = "1. item1\n2. item2\n"
+    assert ol.to_markdown() == list_string
+
+
 def test_ordered_list_html(ol):
     list_string = "<ol>\n<li>item1</li>\n<li>item2</li>\n</ol>"
     assert ol.to_html() == list_string
@@ -114,5 +172,117 @@ def test_plot_to_markdown(plot):
 
 
 def test_plot_to_html(plot):
-    expected = '<p><img href="test.png" title="title">alt</img></p>'
+    expected = '<p><img src="test.png" alt="alt" title="title" /></p>'
     assert plot.to_html() == expected
+
+
+def test_table_eq(table):
+    other = Table(table.content)
+    assert table == other
+    other = Table(table.content.head(2))
+    assert table != other
+
+
+def test_table_to_markdown(table):
+    expected = ("|  | a | b | c |\n|---:|---:|---:|---|\n"
+                "| 0 | 1 | 0.25 | x |\n| 1 | 2 | 0.5 | y\\| |\n| 2 | 3 | 0.75 | z |\n")
+    assert table.to_markdown() == expected
+
+
+def test_table_to_html(table):
+    table.index = False
+    expected = ("<table>\n<thead>\n<tr><th>a</th><th>b</th><th>c</th></tr>\n</thead>\n<tbody>\n"
+                "<tr><td>1</td><td>0.25</td><td>x</td></tr>\n"
+                "<tr><td>2</td><td>0.5</td><td>y|</td></tr>\n"
+                "<tr><td>3</td><td>0.75</td><td>z</td></tr>\n</tbody>\n</table>")
+    assert table.to_html() == expected
+
+
+def test_table_precision(table):
+    table.precision = 1
+    assert table._format(str)[1][2] == ["0.2", "0.5", "0.8"]
+
+
+def test_table_truncation(table):
+    table.max_rows = 2
+    table.max_cols = 2
+    expected = ("|  | a | ... | c |\n|---:|---:|---|---|\n"
+                "| 0 | 1 | ... | x |\n| ... | ... | ... | ... |\n| 2 | 3 | ... | z |\n")
+    assert table.to_markdown() == expected
+
+
+def test_table_digest(table):
+    digest = table.digest()
+    assert Table(table.content).digest() == digest
+    table.content.iloc[0, 0] = 10
+    assert table.digest() != digest
+
+
+class Counter():
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_table_digest_index_names(table):
+    digest = table.digest()
+    table.content.index.name = "first"
+    assert table.digest() != digest
+    renamed = table.digest()
+    table.content.columns.name = "columns"
+    assert table.digest() != renamed
+
+
+def test_table_digest_unhashable_cells():
+    table = Table(pd.DataFrame({"a": [[1, 2], [3]], "b": [{"c": 1}, {}]}))
+    assert table.digest() is None
+    assert table.to_markdown().startswith("|  | a | b |")
+
+
+def test_lazy_defers_factory():
+    factory = Counter(Paragraph("PPP"))
+    lazy = Lazy(factory)
+    assert factory.calls == 0
+    assert lazy.to_markdown() == "PPP\n"
+    assert lazy.to_html() == "<p>PPP</p>"
+    assert factory.calls == 1
+
+
+def test_lazy_without_memoize():
+    factory = Counter(Paragraph("PPP"))
+    lazy = Lazy(factory, memoize=False)
+    lazy.to_markdown()
+    lazy.to_html()
+    assert factory.calls == 2
+    assert lazy.digest() is None
+
+
+def test_lazy_wrapper():
+    lazy = Lazy(Counter("test.png"), Plot, title="title", alttxt="alt")
+    assert lazy.to_markdown() == '![alt](test.png "title")'
+    assert lazy.digest() == Plot("test.png", title="title", alttxt="alt").digest()
+
+
+def test_lazy_table():
+    lazy = Lazy(Counter(pd.DataFrame({"a": [1]})), Table, index=False)
+    assert lazy.to_markdown() == "| a |\n|---:|\n| 1 |\n"
+
+
+def test_table_preview():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "b": list("wxyz")})
+    preview = TablePreview(df, "tables/t.csv.gz", max_rows=2, index=False)
+    expected = ("| a | b |\n|---:|---|\n| 1.0 | w |\n| ... | ... |\n| 4.0 | z |\n\n"
+                "|  | a |\n|---|---:|\n| count | 4.0 |\n| mean | 2.5 |\n| std | 1.291 |\n"
+                "| min | 1.0 |\n| 25% | 1.75 |\n| 50% | 2.5 |\n| 75% | 3.25 |\n| max | 4.0 |\n\n"
+                "[Full data: 4 rows x 2 columns](tables/t.csv.gz)")
+    assert preview.to_markdown() == expected
+    assert preview.to_html().endswith(
+        '<p><a href="tables/t.csv.gz">Full data: 4 rows x 2 columns</a></p>')
+    changed = df.copy()
+    changed.loc[1, "a"] = 10.0
+    assert TablePreview(changed, "tables/t.csv.gz", max_rows=2).digest() != \
+        TablePreview(df, "tables/t.csv.gz", max_rows=2).digest()
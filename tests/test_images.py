@@ -0,0 +1,94 @@
+import base64
+import io
+import os
+import pickle
+
+import pytest
+
+from ouroboreport.images import encode_image
+from ouroboreport.images import encode_images
+from ouroboreport.images import ImageCache
+
+
+def decode(uri):
+    header, data = uri.split(",", 1)
+    return header, base64.b64decode(data)
+
+
+@pytest.fixture
+def large_png(tmpdir):
+    image = pytest.importorskip("PIL.Image")
+    path = tmpdir.join("large.png")
+    image.new("RGB", (800, 400), "red").save(str(path))
+    return path
+
+
+def test_encode_image(tmpdir):
+    path = tmpdir.join("plot.svg")
+    path.write("<svg/>")
+    assert decode(encode_image(path)) == ("data:image/svg+xml;base64", b"<svg/>")
+
+
+def test_encode_image_keeps_vector_images(tmpdir):
+    path = tmpdir.join("plot.svg")
+    path.write("<svg/>")
+    assert decode(encode_image(path, max_size=10))[1] == b"<svg/>"
+
+
+def test_encode_image_downscales(large_png):
+    image = pytest.importorskip("PIL.Image")
+    header, data = decode(encode_image(large_png, max_size=100))
+    assert header == "data:image/png;base64"
+    assert image.open(io.BytesIO(data)).size == (100, 50)
+
+
+def test_encode_image_downscale_keeps_alpha(tmpdir):
+    image = pytest.importorskip("PIL.Image")
+    path = tmpdir.join("large.webp")
+    noise = image.frombytes("RGBA", (800, 400), os.urandom(800 * 400 * 4))
+    noise.save(str(path), lossless=True)
+    data = decode(encode_image(path, max_size=100))[1]
+    downscaled = image.open(io.BytesIO(data))
+    assert downscaled.size == (100, 50)
+    assert downscaled.mode == "RGBA"
+
+
+def test_encode_images_without_resizing_uses_threads(tmpdir, monkeypatch):
+    import concurrent.futures
+
+    class NoProcesses():
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("process pool started")
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", NoProcesses)
+    paths = []
+    for i in range(3):
+        path = tmpdir.join(f"{i}.svg")
+        path.write(f"<svg>{i}</svg>")
+        paths.append(path)
+    uris = encode_images(paths, max_size=100)
+    assert [decode(uri)[1] for uri in uris] == [b"<svg>0</svg>", b"<svg>1</svg>", b"<svg>2</svg>"]
+
+
+def test_encode_images_dedupes_and_caches(tmpdir):
+    paths = []
+    for name, content in [("a.svg", "<svg>a</svg>"), ("b.svg", "<svg>b</svg>"),
+                          ("c.svg", "<svg>a</svg>")]:
+        path = tmpdir.join(name)
+        path.write(content)
+        paths.append(path)
+    cache = ImageCache()
+    uris = encode_images(paths, workers=2, cache=cache)
+    assert [decode(uri)[1] for uri in uris] == [b"<svg>a</svg>", b"<svg>b</svg>", b"<svg>a</svg>"]
+    assert len(cache) == 2
+    paths[0].write("<svg>changed</svg>")
+    assert decode(encode_images(paths[:1], cache=cache)[0])[1] == b"<svg>changed</svg>"
+    assert len(cache) == 3
+
+
+def test_image_cache_evicts_and_pickles():
+    cache = ImageCache(maxsize=1)
+    cache.put("a", "data:a")
+    cache.put("b", "data:b")
+    assert cache.get("a") is None
+    assert pickle.loads(pickle.dumps(cache)).get("b") == "data:b"
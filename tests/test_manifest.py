@@ -0,0 +1,108 @@
+import io
+
+import pytest
+
+from ouroboreport.components import Header
+from ouroboreport.components import Paragraph
+from ouroboreport.manifest import manifest_path
+from ouroboreport.manifest import RenderManifest
+from ouroboreport.manifest import save_sections
+from ouroboreport.manifest import section_digest
+from ouroboreport.manifest import split_sections
+from ouroboreport.report import Report
+
+
+class FakeComponent():
+    def to_markdown(self):
+        return "# TEST"
+
+
+@pytest.fixture
+def report():
+    report = Report(cache_size=0)
+    report.add_paragraph("intro")
+    for i in range(3):
+        report.add_header1(f"Section {i}")
+        report.add_paragraph(f"text {i}")
+    return report
+
+
+def render_counter(calls):
+    def render_section(section):
+        calls.append(section)
+        return "\n".join(c.to_markdown() for c in section)
+    return render_section
+
+
+def test_split_sections(report):
+    sections = split_sections(report.get_components())
+    assert [len(section) for section in sections] == [1, 2, 2, 2]
+    assert sections[1] == [Header("Section 0"), Paragraph("text 0")]
+
+
+def test_split_sections_empty():
+    assert split_sections([]) == []
+
+
+def test_section_digest():
+    assert section_digest([Header("a")]) == section_digest([Header("a")])
+    assert section_digest([Header("a")]) != section_digest([Header("b")])
+    assert section_digest([Header("a"), FakeComponent()]) is None
+
+
+def test_save_sections_reuses_unchanged(tmpdir, report):
+    dest = tmpdir / "report.md"
+    calls = []
+    assert save_sections(dest, report.get_sections(), render_counter(calls), "markdown") == 4
+
+    report.components[4] = Paragraph("changed")
+    calls.clear()
+    assert save_sections(dest, report.get_sections(), render_counter(calls), "markdown") == 1
+    assert calls == [[Header("Section 1"), Paragraph("changed")]]
+
+    expected = io.StringIO()
+    report.save_markdown(expected)
+    assert dest.read() == expected.getvalue()
+
+
+def test_save_sections_rebuilds_edited_output(tmpdir, report):
+    dest = tmpdir / "report.md"
+    save_sections(dest, report.get_sections(), render_counter([]), "markdown")
+    dest.write("edited by hand")
+    assert save_sections(dest, report.get_sections(), render_counter([]), "markdown") == 4
+
+
+def test_save_sections_rebuilds_same_length_edit(tmpdir, report):
+    dest = tmpdir / "report.md"
+    save_sections(dest, report.get_sections(), render_counter([]), "markdown")
+    original = dest.read()
+    dest.write(original.replace("#", "!", 1))
+    assert save_sections(dest, report.get_sections(), render_counter([]), "markdown") == 4
+    assert dest.read() == original
+
+
+def test_manifest_roundtrip(tmpdir):
+    path = tmpdir / "report.md.manifest.json"
+    RenderManifest("html", [("abc", 0, 3)], 4, "def").save(path)
+    manifest = RenderManifest.load(path, "html")
+    assert manifest.spans() == {"abc": (0, 3)}
+    assert manifest.length == 4
+    assert manifest.content == "def"
+    assert RenderManifest.load(path, "markdown") is None
+
+
+def test_manifest_path(tmpdir):
+    assert manifest_path(tmpdir / "report.html").name == "report.html.manifest.json"
+
+
+@pytest.mark.parametrize("fmt", ["markdown", "html"])
+def test_report_incremental_save(tmpdir, report, fmt):
+    full = tmpdir / "full"
+    incremental = tmpdir / "incremental"
+    save = getattr(report, f"save_{fmt}")
+    save(incremental, incremental=True)
+    report.add_header2("New")
+    save(full)
+    save(incremental, incremental=True)
+    assert incremental.read() == full.read()
+    assert manifest_path(incremental).exists()
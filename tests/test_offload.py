@@ -0,0 +1,86 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from ouroboreport.components import Lazy
+from ouroboreport.components import Table
+from ouroboreport.components import TablePreview
+from ouroboreport.offload import TableOffload
+
+
+@pytest.fixture
+def table():
+    return Table(pd.DataFrame({"a": range(100), "b": range(100)}), precision=1)
+
+
+def test_offload_threshold(table):
+    assert TableOffload(max_cells=199).table(table) is table
+    assert TableOffload(max_cells=200).table(table) is None
+    assert TableOffload(max_cells=0).table("not a table") is None
+    lazy = Lazy(lambda: table.content, Table)
+    assert TableOffload(max_cells=0).table(lazy).content.equals(table.content)
+
+
+def test_offload_table_subclasses(table):
+    class WideTable(Table):
+        __slots__ = ()
+
+    wide = WideTable(table.content)
+    assert TableOffload(max_cells=0).table(wide) is wide
+    preview = TableOffload().preview(table, "tables/t.csv.gz")
+    assert TableOffload(max_cells=0).table(preview) is None
+
+
+def test_offload_write_csv(tmpdir, table):
+    path = TableOffload().write(table, tmpdir / "tables")
+    assert path.name.endswith(".csv.gz")
+    with gzip.open(path, "rt") as infile:
+        assert pd.read_csv(infile, index_col=0).equals(table.content)
+    assert TableOffload().write(table, tmpdir / "tables") == path
+
+
+def test_offload_write_is_byte_stable(tmpdir, table):
+    paths = [TableOffload().write(table, tmpdir / name) for name in ("first", "second")]
+    contents = []
+    for path in paths:
+        with open(path, "rb") as infile:
+            contents.append(infile.read())
+    assert contents[0] == contents[1]
+    # gzip header flags and mtime: no file name, no timestamp
+    assert contents[0][3:8] == bytes(5)
+    assert [path.basename for path in (tmpdir / "second").listdir()] == [paths[1].name]
+
+
+def test_offload_write_names_by_index_name(tmpdir, table):
+    renamed = Table(table.content.rename_axis("row"))
+    assert TableOffload().write(renamed, tmpdir) != TableOffload().write(table, tmpdir)
+
+
+def test_offload_write_unhashable_cells(tmpdir):
+    table = Table(pd.DataFrame({"a": [[1, 2], [3]]}))
+    path = TableOffload().write(table, tmpdir)
+    assert "None" not in path.name
+    assert TableOffload().write(Table(pd.DataFrame({"a": [[1], [3]]})), tmpdir) != path
+
+
+def test_offload_write_parquet(tmpdir):
+    pytest.importorskip("pyarrow")
+    table = Table(pd.DataFrame({0: [1, 2]}), index=False)
+    path = TableOffload(fmt="parquet").write(table, tmpdir)
+    assert pd.read_parquet(path).columns.tolist() == ["0"]
+
+
+def test_offload_unknown_format():
+    with pytest.raises(ValueError):
+        TableOffload(fmt="xlsx")
+
+
+def test_offload_preview(table):
+    preview = TableOffload(preview_rows=4).preview(table, "tables/t.csv.gz")
+    assert isinstance(preview, TablePreview)
+    assert preview.max_rows == 4 and preview.precision == 1
+    assert preview.to_markdown().endswith("[Full data: 100 rows x 2 columns](tables/t.csv.gz)")
+    attached = TableOffload().preview(table, "t.csv.gz", attachment=True)
+    assert attached.to_markdown().endswith(
+        "`[Full data: 100 rows x 2 columns|^t.csv.gz]`{=jira}")
@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from ouroboreport.components import Header
+from ouroboreport.components import Lazy
+from ouroboreport.components import Paragraph
+from ouroboreport.components import Table
+from ouroboreport.components import UnorderedList
+from ouroboreport.pages import escape
+from ouroboreport.pages import index_document
+from ouroboreport.pages import navigation
+from ouroboreport.pages import Paginator
+from ouroboreport.pages import size_hint
+from ouroboreport.segment import Segment
+from ouroboreport.segment import write_segment
+
+
+class FakeReport():
+    title = "Report"
+
+    def __init__(self, components):
+        self.components = components
+
+    def get_components(self):
+        return self.components
+
+
+@pytest.fixture
+def components():
+    return [Paragraph("intro"), Header("A", 1), Paragraph("a"), Header("A.1", 2),
+            Paragraph("a.1"), Header("B", 1), Paragraph("b")]
+
+
+def test_split_at_headers(components):
+    pages = Paginator(level=1).split(components)
+    assert pages == [components[:1], components[1:5], components[5:]]
+    assert len(Paginator(level=2).split(components)) == 4
+    assert Paginator(level=None).split(components) == [components]
+
+
+def test_split_at_size():
+    components = [Paragraph("x" * 10) for _ in range(5)]
+    pages = Paginator(level=None, max_chars=25).split(components)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert Paginator(level=None, max_chars=5).split(components[:2]) == [[c] for c in components[:2]]
+
+
+def test_size_hint():
+    assert size_hint(Paragraph("abc")) == 3
+    assert size_hint(UnorderedList(["a", "bb"])) == 11
+    table = Table(pd.DataFrame({"a": range(1000), "b": range(1000)}), max_rows=8)
+    assert size_hint(table) == 11 * 3 * 10
+
+
+def test_size_hint_lazy():
+    df = pd.DataFrame({"a": range(1000), "b": range(1000)})
+    assert size_hint(Lazy(lambda: df, Table, max_rows=8)) == 11 * 3 * 10
+    assert size_hint(Lazy(lambda: df, Table, memoize=False)) == 0
+
+
+def test_size_hint_segment_table(tmpdir):
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame({"a": range(1000), "b": range(1000)})
+    segment = Segment(write_segment([Table(df, max_rows=8)], tmpdir / "seg"))
+    table = segment[0]
+    assert size_hint(table) == 11 * 3 * 10
+    assert Paginator(level=None, max_chars=100).split([Paragraph("a"), table]) == \
+        [[Paragraph("a")], [table]]
+
+
+def test_pages_titles(components):
+    pages = Paginator().pages(FakeReport(components))
+    assert [(page.number, page.title) for page in pages] == [(1, "Page 1"), (2, "A"), (3, "B")]
+    assert pages[1].get_components() == components[1:5]
+
+
+def test_page_path():
+    assert Paginator.page_path("out/report.html", 2).as_posix() == "out/report-002.html"
+
+
+def test_index_and_navigation():
+    assert index_document("markdown", "T", [("A", "a.md")]) == "# T\n\n* [A](a.md)\n"
+    assert index_document("html", "T", [("A", "a.html")]) == \
+        '<h1>T</h1>\n<ul>\n<li><a href="a.html">A</a></li>\n</ul>\n'
+    assert navigation("markdown", "i.md", following="2.md") == "[Index](i.md) | [Next](2.md)\n"
+    assert navigation("html", "i.html", "1.html") == \
+        '<p><a href="1.html">Previous</a> | <a href="i.html">Index</a></p>\n'
+
+
+def test_index_and_navigation_escape():
+    assert index_document("markdown", "*T*", [("[A]", "a b.md")]) == \
+        "# \\*T\\*\n\n* [\\[A\\]](a%20b.md)\n"
+    assert index_document("html", "<T>", [("A & B", "a.html")]) == \
+        '<h1>&lt;T&gt;</h1>\n<ul>\n<li><a href="a.html">A &amp; B</a></li>\n</ul>\n'
+    assert escape("jira", "A | [B]") == "A \\| \\[B\\]"
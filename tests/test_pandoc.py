@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+
+import pytest
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from ouroboreport import pandoc
+from ouroboreport.pandoc import PandocPool
+from ouroboreport.pandoc import PandocServer
+from ouroboreport.pandoc import PandocServerError
+
+
+class FakeServer():
+    instances = []
+
+    def __init__(self):
+        self.alive = False
+        self.fail = False
+        self.starts = 0
+        self.requests = 0
+        FakeServer.instances.append(self)
+
+    def start(self):
+        self.alive = True
+        self.starts += 1
+        return self
+
+    def healthy(self):
+        return self.alive
+
+    def convert(self, text, to, fmt):
+        self.requests += 1
+        if self.fail:
+            self.alive = False
+            raise PandocServerError("failed")
+        return f"{fmt}->{to}:{text}"
+
+    def stop(self):
+        self.alive = False
+
+
+class BrokenServer(FakeServer):
+    def start(self):
+        raise PandocServerError("cannot start")
+
+
+@pytest.fixture(autouse=True)
+def reset_fake_servers():
+    FakeServer.instances = []
+    yield
+    pandoc.stop_pool()
+
+
+def test_pool_round_robin():
+    pool = PandocPool(size=2, server_factory=FakeServer)
+    for _ in range(4):
+        assert pool.convert_text("x", "html", "markdown") == "markdown->html:x"
+    assert [server.requests for server in FakeServer.instances] == [2, 2]
+    assert pool.health() == [True, True]
+    pool.close()
+    assert not any(server.alive for server in FakeServer.instances)
+
+
+def test_pool_restarts_failed_server():
+    pool = PandocPool(size=1, server_factory=FakeServer)
+    pool.convert_text("x", "html", "markdown")
+    server = FakeServer.instances[0]
+    server.fail = True
+    assert pool.convert_text("# x", "html", "markdown").startswith("<h1")
+    assert server.starts == 2
+    assert pool.fallbacks == 1
+
+
+class SlowFailingServer(FakeServer):
+    barrier = None
+
+    def start(self):
+        time.sleep(0.05)
+        return super().start()
+
+    def convert(self, text, to, fmt):
+        if self.fail:
+            self.alive = False
+            self.barrier.wait()
+            raise PandocServerError("failed")
+        return super().convert(text, to, fmt)
+
+
+def test_pool_restarts_failed_server_once():
+    pool = PandocPool(size=1, server_factory=SlowFailingServer)
+    pool.convert_text("x", "html", "markdown")
+    server = FakeServer.instances[0]
+    server.fail = True
+    SlowFailingServer.barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=pool.convert_text, args=("# x", "html", "markdown"))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert server.starts == 2
+    assert pool.fallbacks == 2
+
+
+class OneShotServer(FakeServer):
+    def start(self):
+        if self.starts:
+            raise PandocServerError("cannot restart")
+        return super().start()
+
+
+def test_pool_drops_server_that_cannot_restart():
+    pool = PandocPool(size=2, server_factory=OneShotServer)
+    for _ in range(2):
+        pool.convert_text("x", "html", "markdown")
+    first, second = FakeServer.instances
+    first.fail = True
+    assert pool.convert_text("# x", "html", "markdown").startswith("<h1")
+    assert pool.health() == [True]
+    assert not pool.disabled
+    for _ in range(2):
+        assert pool.convert_text("x", "html", "markdown") == "markdown->html:x"
+    assert first.requests == 2
+    assert second.requests == 3
+
+    second.fail = True
+    assert pool.convert_text("# x", "html", "markdown").startswith("<h1")
+    assert pool.disabled
+    assert pool.convert_text("# x", "html", "markdown").startswith("<h1")
+    assert second.requests == 4
+    assert pool.fallbacks == 3
+
+
+def test_pool_disabled_when_servers_cannot_start():
+    pool = PandocPool(size=2, server_factory=BrokenServer)
+    assert pool.convert_text("# x", "html", "markdown").startswith("<h1")
+    assert pool.disabled
+    assert pool.fallbacks == 1
+
+
+def test_convert_text_uses_shared_pool():
+    pool = pandoc.start_pool(size=1)
+    pool.server_factory = FakeServer
+    assert pandoc.convert_text("x", "jira", "markdown") == "markdown->jira:x"
+    pandoc.stop_pool()
+    assert pandoc.convert_text("# x", "html", "markdown").startswith("<h1")
+
+
+class StubPandocHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = {"output": f"{request['from']}->{request['to']}:{request['text']}",
+                "base64": False, "messages": []}
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"3.0")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pandoc_server_convert():
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubPandocHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    try:
+        server = PandocServer()
+        server.url = f"http://127.0.0.1:{stub.server_port}"
+        assert server.healthy()
+        assert server.convert("x", "html", "markdown") == "markdown->html:x"
+    finally:
+        stub.shutdown()
+        stub.server_close()
+
+
+def test_pandoc_server_unreachable():
+    server = PandocServer()
+    server.url = "http://127.0.0.1:9"
+    assert not server.healthy()
+    with pytest.raises(PandocServerError):
+        server.convert("x", "html", "markdown")
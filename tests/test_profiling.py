@@ -0,0 +1,61 @@
+import logging
+import pickle
+
+import pytest
+
+from ouroboreport.profiling import RenderProfile
+from ouroboreport.profiling import stage
+
+
+@pytest.fixture
+def profile():
+    return RenderProfile()
+
+
+def test_stage_records_calls_and_bytes(profile):
+    with profile.stage("write", 10):
+        pass
+    with profile.stage("write", 5):
+        pass
+    summary = profile.to_dict()["stages"]["write"]
+    assert summary["calls"] == 2
+    assert summary["bytes"] == 15
+    assert summary["seconds"] >= 0
+
+
+def test_stage_records_on_error(profile):
+    with pytest.raises(ValueError):
+        with profile.stage("pandoc"):
+            raise ValueError()
+    assert profile.to_dict()["stages"]["pandoc"]["calls"] == 1
+
+
+def test_record_component(profile):
+    profile.record_component("Header", 0.5, 3)
+    profile.record_component("Header", 0.25, 4)
+    assert profile.to_dict()["components"] == {
+        "Header": {"calls": 2, "seconds": 0.75, "chars": 7}}
+
+
+def test_disabled_stage_is_noop():
+    with stage(None, "write"):
+        pass
+
+
+def test_emit_to_callback_and_logger(caplog):
+    summaries = []
+    profile = RenderProfile(callback=summaries.append, logger=logging.getLogger("test"))
+    profile.record_stage("render", 1.0)
+    with caplog.at_level(logging.INFO):
+        summary = profile.emit({"cache": {"hits": 1}})
+    assert summaries == [summary]
+    assert summary["cache"] == {"hits": 1}
+    assert "render" in caplog.text
+
+
+def test_reset_and_pickle(profile):
+    profile.record_stage("render", 1.0)
+    clone = pickle.loads(pickle.dumps(profile))
+    profile.reset()
+    assert profile.to_dict() == {"stages": {}, "components": {}}
+    assert clone.to_dict()["stages"]["render"]["calls"] == 1
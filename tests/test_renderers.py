@@ -1,18 +1,42 @@
+import io
+import json
 import os
+import subprocess
+import threading
+import time
+import pandas as pd
 import pytest
 
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
 from pathlib import Path
+import requests
+
+from ouroboreport.components import Header
+from ouroboreport.components import Lazy
+from ouroboreport.components import Paragraph
 from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.components import TablePreview
+from ouroboreport.offload import TableOffload
+from ouroboreport.pages import Paginator
 from ouroboreport.renderers import ConfluenceRenderer
 from ouroboreport.renderers import MarkdownRenderer
 from ouroboreport.renderers import HTMLRenderer
+from ouroboreport.renderers import PDFRenderer
 
 
 class FakeComponent():
     def to_markdown(self):
         return  "# TEST"
 
+    def to_html(self):
+        return "<h1>TEST</h1>"
+
 class FakeReport():
+    title = "Fake Report"
+
     def __init__(self, components):
         self.components = components
 
@@ -34,13 +58,36 @@ def test_markdown_renderer(tmpdir, report):
     assert p.read() == "# TEST\n# TEST"
 
 
+def test_markdown_renderer_file_like(report):
+    out = io.StringIO()
+    MarkdownRenderer().save(report, out)
+    assert out.getvalue() == "# TEST\n# TEST"
+
+
+def test_markdown_renderer_iter_markdown(report):
+    chunks = list(MarkdownRenderer().iter_markdown(report.get_components()))
+    assert chunks == ["# TEST", "\n", "# TEST"]
+
+
 def test_html_renderer(tmpdir, report):
     p = tmpdir.mkdir("sub").join("test.html")
     HTMLRenderer().save(report, p)
+    expected = '<h1>TEST</h1>\n<h1>TEST</h1>\n'
+    assert p.read() == expected
+
+
+def test_html_renderer_pandoc(tmpdir, report):
+    p = tmpdir.mkdir("sub").join("test.html")
+    HTMLRenderer(engine="pandoc").save(report, p)
     expected = '<h1 id="test">TEST</h1>\n<h1 id="test-1">TEST</h1>\n'
     assert p.read() == expected
 
 
+def test_html_renderer_unknown_engine():
+    with pytest.raises(ValueError):
+        HTMLRenderer(engine="fake")
+
+
 def test_confluence_set_parent():
     renderer = ConfluenceRenderer()
     renderer.set_parent("test")
@@ -115,3 +162,286 @@ def test_html_renderer_move_plots(tmpdir):
     assert new_report.components[1].to_markdown() == "# TEST"
 
 
+class StubConfluenceHandler(BaseHTTPRequestHandler):
+    """Minimal Confluence REST API: pages are created with id 123"""
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path))
+        if self.path.startswith("/rest/api/content?"):
+            self._respond(200, {"results": [server.page] if server.page else []})
+        elif self.path.startswith("/rest/api/content/123?"):
+            self._respond(200, server.page or {"id": "123", "version": {"number": 1}})
+        else:
+            self._respond(200, {"results": []})
+
+    def do_PUT(self):
+        self.do_POST()
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            if "/property" in self.path:
+                server.properties.append(json.loads(body))
+            is_attachment = self.path.endswith("/attachment")
+            fail = is_attachment and server.failures > 0
+            if fail:
+                server.failures -= 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        if is_attachment:
+            time.sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+        if fail:
+            self._respond(503, {"message": "unavailable"})
+        else:
+            self._respond(200, {"id": "123", "results": []})
+
+    def _respond(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def confluence_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubConfluenceHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.properties = []
+    server.page = None
+    server.failures = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def plot_report(tmpdir):
+    plots = []
+    for i in range(4):
+        path = tmpdir / f"plot{i}.png"
+        path.write("png")
+        plots.append(Plot(str(path)))
+    return FakeReport(plots + [FakeComponent()])
+
+
+def stub_renderer(server, **kwargs):
+    return ConfluenceRenderer(space="TEST", url=f"http://127.0.0.1:{server.server_port}",
+                              username="user", token="token", parent="1", **kwargs)
+
+
+def test_confluence_save_uploads_concurrently(confluence_server, plot_report):
+    stub_renderer(confluence_server, upload_workers=4).save(plot_report)
+    posts = [path for method, path in confluence_server.requests if method == "POST"]
+    assert posts[0] == "/rest/api/content"
+    assert posts[1:] == ["/rest/api/content/123/child/attachment"] * 4
+    assert confluence_server.max_in_flight > 1
+
+
+def test_confluence_upload_retries(confluence_server, plot_report):
+    confluence_server.failures = 2
+    stub_renderer(confluence_server, backoff=0).save(plot_report)
+    attachments = [path for _, path in confluence_server.requests if path.endswith("/attachment")]
+    assert len(attachments) == 6
+
+
+def test_confluence_upload_gives_up(confluence_server, plot_report):
+    confluence_server.failures = 10
+    with pytest.raises(requests.HTTPError):
+        stub_renderer(confluence_server, upload_workers=1, retries=1, backoff=0).save(plot_report)
+
+
+def test_confluence_update_creates_missing_page(confluence_server, plot_report):
+    stub_renderer(confluence_server, update=True).save(plot_report)
+    posts = [path for method, path in confluence_server.requests if method == "POST"]
+    assert posts[0] == "/rest/api/content"
+    assert posts.count("/rest/api/content/123/child/attachment") == 4
+    assert posts[-1] == "/rest/api/content/123/property"
+    assert len(confluence_server.properties[0]["value"]["attachments"]) == 4
+
+
+def test_confluence_update_unchanged_is_single_read(confluence_server, plot_report):
+    stub_renderer(confluence_server, update=True).save(plot_report)
+    manifest = confluence_server.properties[0]
+    manifest["version"] = {"number": 1}
+    confluence_server.page = {"id": "123", "version": {"number": 2},
+                              "metadata": {"properties": {"ouroboreport": manifest}}}
+    confluence_server.requests.clear()
+
+    stub_renderer(confluence_server, update=True).save(plot_report)
+    assert [method for method, _ in confluence_server.requests] == ["GET"]
+
+
+def test_confluence_update_uploads_changed_plots(confluence_server, plot_report):
+    stub_renderer(confluence_server, update=True).save(plot_report)
+    manifest = confluence_server.properties[0]
+    manifest["version"] = {"number": 1}
+    confluence_server.page = {"id": "123", "version": {"number": 2},
+                              "metadata": {"properties": {"ouroboreport": manifest}}}
+    confluence_server.requests.clear()
+
+    plot_report.components[0].get_path().write_text("new png")
+    stub_renderer(confluence_server, update=True).save(plot_report)
+    writes = [(method, path) for method, path in confluence_server.requests if method != "GET"]
+    assert writes == [("POST", "/rest/api/content/123/child/attachment"),
+                      ("PUT", "/rest/api/content/123/property/ouroboreport")]
+    assert confluence_server.properties[-1]["version"] == {"number": 2}
+
+
+def test_html_renderer_dedupe_plots(tmpdir):
+    tmpdir = Path(tmpdir)
+    renderer = HTMLRenderer(cp_img_to_path=True, relocation="hardlink", dedupe=True)
+    for name in ("a", "b"):
+        os.mkdir(tmpdir / name)
+        (tmpdir / name / "plot.png").write_text("same png")
+    report = FakeReport([FakePlot(tmpdir / "a" / "plot.png"),
+                         FakePlot(tmpdir / "b" / "plot.png")])
+
+    new_report = renderer._relocate_image_files(tmpdir / "fake.html", report)
+    paths = [c.get_path() for c in new_report.components]
+    assert paths[0] == paths[1]
+    assert os.listdir(tmpdir / "plots") == [paths[0].name]
+    assert report.components[0].get_path() == tmpdir / "a" / "plot.png"
+
+
+def test_html_renderer_unknown_relocation():
+    with pytest.raises(ValueError):
+        HTMLRenderer(relocation="teleport")
+
+
+def test_html_renderer_embed_images(tmpdir, plot_report):
+    dest = tmpdir / "report.html"
+    HTMLRenderer(embed_images=True, image_workers=1).save(plot_report, dest)
+    content = dest.read()
+    assert content.count('src="data:image/png;base64,cG5n"') == 4
+    assert plot_report.components[0].get_path() == Path(tmpdir / "plot0.png")
+
+
+def test_html_renderer_embed_images_resolves_lazy_once(tmpdir, plot_report):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return Paragraph("lazy")
+
+    plot_report.add_component(Lazy(factory, memoize=False))
+    dest = tmpdir / "report.html"
+    HTMLRenderer(embed_images=True, image_workers=1).save(plot_report, dest)
+    assert dest.read().endswith("<p>lazy</p>\n")
+    assert len(calls) == 1
+
+
+def test_html_renderer_embed_or_copy_images():
+    with pytest.raises(ValueError):
+        HTMLRenderer(cp_img_to_path=True, embed_images=True)
+
+
+def test_markdown_renderer_paginate(tmpdir):
+    report = FakeReport([Header("A"), Paragraph("a"), Header("B"), Paragraph("b")])
+    MarkdownRenderer(paginate=Paginator(workers=2)).save(report, tmpdir / "report.md")
+    assert (tmpdir / "report.md").read() == \
+        "# Fake Report\n\n* [A](report-001.md)\n* [B](report-002.md)\n"
+    assert (tmpdir / "report-001.md").read() == \
+        "# A\na\n\n[Index](report.md) | [Next](report-002.md)\n"
+    assert (tmpdir / "report-002.md").read().endswith(
+        "[Previous](report-001.md) | [Index](report.md)\n")
+
+
+def test_html_renderer_paginate(tmpdir):
+    report = FakeReport([Header("A"), Paragraph("a"), Header("B"), Paragraph("b")])
+    HTMLRenderer(paginate=Paginator()).save(report, tmpdir / "report.html")
+    assert '<a href="report-002.html">B</a>' in (tmpdir / "report.html").read()
+    assert (tmpdir / "report-002.html").read().startswith("<h1>B</h1>\n<p>b</p>\n<p>")
+
+
+def test_paginate_needs_path_and_no_incremental(report):
+    with pytest.raises(ValueError):
+        MarkdownRenderer(paginate=Paginator()).save(report, io.StringIO())
+    with pytest.raises(ValueError):
+        MarkdownRenderer(incremental=True, paginate=Paginator())
+
+
+def test_confluence_save_paginated(confluence_server, plot_report):
+    plot_report.components = [Header("A")] + plot_report.components[:2] + [Header("B")]
+    stub_renderer(confluence_server, paginate=Paginator(workers=2)).save(plot_report)
+    posts = [path for command, path in confluence_server.requests if command == "POST"]
+    assert posts.count("/rest/api/content") == 3
+    assert sum(path.endswith("/attachment") for path in posts) == 2
+
+
+def test_markdown_renderer_offload(tmpdir):
+    df = pd.DataFrame({"a": range(50)})
+    report = FakeReport([Header("A"), Table(df), Table(df.head(2))])
+    MarkdownRenderer(offload=TableOffload(max_cells=10, preview_rows=2)).save(
+        report, tmpdir / "report.md")
+    content = (tmpdir / "report.md").read()
+    name = os.listdir(tmpdir / "tables")[0]
+    assert f"[Full data: 50 rows x 1 columns](tables/{name})" in content
+    assert "| 49 | 49 |" in content and "| 48 |" not in content
+    assert report.components[1].content.equals(df)
+
+
+def test_confluence_save_offload(confluence_server, plot_report):
+    plot_report.components = [Header("A"), Table(pd.DataFrame({"a": range(50)}))]
+    stub_renderer(confluence_server, offload=TableOffload(max_cells=10)).save(plot_report)
+    posts = [path for command, path in confluence_server.requests if command == "POST"]
+    assert sum(path.endswith("/attachment") for path in posts) == 1
+
+
+def test_confluence_attachment_links(confluence_server):
+    df = pd.DataFrame({"a": range(50)})
+    report = FakeReport([Paragraph("a |%5E b"),
+                         TablePreview(df, "t.csv.gz", max_rows=2, attachment=True)])
+    content = stub_renderer(confluence_server)._convert_to_jira_wiki(report)
+    assert "[Full data: 50 rows x 1 columns|^t.csv.gz]" in content
+    assert "%5E b" in content
+
+
+def test_incremental_needs_path(report):
+    with pytest.raises(ValueError):
+        MarkdownRenderer(incremental=True).save(report, io.StringIO())
+
+
+def test_incremental_needs_native_html():
+    with pytest.raises(ValueError):
+        HTMLRenderer(engine="pandoc", incremental=True)
+
+
+class FakeCompletedProcess():
+    def __init__(self, returncode=0, stderr=b""):
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+def test_pdf_renderer_pipes_markdown(tmpdir, report, monkeypatch):
+    calls = []
+    monkeypatch.setattr(subprocess, "run",
+                        lambda command, **kwargs: calls.append((command, kwargs))
+                        or FakeCompletedProcess())
+    dest = tmpdir / "report.pdf"
+    PDFRenderer(engine="weasyprint", cache_dir=tmpdir / "texcache").save(report, dest)
+
+    command, kwargs = calls[0]
+    assert kwargs["input"] == b"# TEST\n# TEST"
+    assert "--pdf-engine=weasyprint" in command
+    assert command[command.index("--output") + 1] == str(dest)
+    assert kwargs["env"]["TEXMFVAR"] == str(tmpdir / "texcache")
+
+
+def test_pdf_renderer_raises_pandoc_error(tmpdir, report, monkeypatch):
+    monkeypatch.setattr(subprocess, "run",
+                        lambda command, **kwargs: FakeCompletedProcess(43, b"no engine"))
+    with pytest.raises(RuntimeError, match="no engine"):
+        PDFRenderer().save(report, tmpdir / "report.pdf")
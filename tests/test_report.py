@@ -1,11 +1,24 @@
+import io
+import subprocess
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import pytest
 
+from ouroboreport.offload import TableOffload
 from ouroboreport.report import Report
 from ouroboreport.report import Header
+from ouroboreport.report import Lazy
 from ouroboreport.report import Paragraph
 from ouroboreport.report import UnorderedList
 from ouroboreport.report import OrderedList
+from ouroboreport.report import Table
+
+# Cumulative microseconds `python -X importtime` may report for ouroboreport.report
+IMPORT_BUDGET_US = 150_000
+HEAVY_MODULES = ("pandas", "numpy", "pypandoc", "atlassian", "requests")
 
 @pytest.fixture
 def report():
@@ -94,3 +107,288 @@ def test_add_table(report):
     df = pd.DataFrame([[1,2]])
     report.add_component(df)
     pd.testing.assert_frame_equal(report.get_components()[0], df)
+
+
+def test_add_table_component(report):
+    df = pd.DataFrame([[1,2]])
+    report.add_table(df)
+    assert report.get_components()[0] == Table(df)
+    assert report.get_components()[0].content is not df
+
+
+def test_add_table_by_reference(report):
+    df = pd.DataFrame([[1,2]])
+    report.add_table(df, copy=False)
+    assert report.get_components()[0].content is df
+
+
+def test_save_markdown_file_like(report, content):
+    report.add_header1(content)
+    report.add_paragraph(content)
+    out = io.StringIO()
+    report.save_markdown(out)
+    assert out.getvalue() == "# content\ncontent\n"
+
+
+def test_report_cache_info(report, content):
+    report.add_header1(content)
+    report.add_paragraph(content)
+    report.save_markdown(io.StringIO())
+    report.save_markdown(io.StringIO())
+    assert report.cache_info().hits == 2
+    assert report.cache_info().misses == 2
+
+
+def test_report_cache_unhashable_table(report):
+    report.add_table(pd.DataFrame({"a": [[1, 2], [3]]}))
+    out = io.StringIO()
+    report.save_markdown(out)
+    assert "[1, 2]" in out.getvalue()
+
+
+def test_report_cache_index_name(report):
+    df = pd.DataFrame({"a": [1]}, index=pd.Index([0], name="first"))
+    report.add_table(df)
+    report.save_markdown(io.StringIO())
+    report.components[0].content.index.name = "second"
+    out = io.StringIO()
+    report.save_markdown(out)
+    assert out.getvalue().startswith("| second | a |")
+
+
+def test_save_all(tmpdir, report, content):
+    report.add_header1(content)
+    report.add_paragraph(content)
+    md_path = tmpdir / "report.md"
+    html_path = tmpdir / "report.html"
+    report.save_all({"markdown": md_path, "html": {"destination": html_path}})
+    assert md_path.read() == "# content\ncontent\n"
+    assert html_path.read() == "<h1>content</h1>\n<p>content</p>\n"
+    assert report.cache_info().misses == 4
+    assert report.cache_info().hits == 4
+
+
+def test_save_all_skips_warming_uncacheable(tmpdir, report, content):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return Paragraph(content)
+
+    report.add_component(Lazy(factory, memoize=False))
+    report.save_all({"markdown": tmpdir / "report.md", "html": tmpdir / "report.html"})
+    assert len(calls) == 2
+
+
+def test_save_all_skips_warming_offloaded_tables(tmpdir, report, monkeypatch):
+    rendered = []
+    for fmt in ("markdown", "html"):
+        def render(self, render=getattr(Table, f"to_{fmt}")):
+            rendered.append((type(self), self.content.shape))
+            return render(self)
+        monkeypatch.setattr(Table, f"to_{fmt}", render)
+
+    report.add_table(pd.DataFrame({"a": range(100)}))
+    report.add_table(pd.DataFrame({"a": range(5)}))
+    offload = TableOffload(max_cells=50)
+    report.save_all({"markdown": {"destination": tmpdir / "report.md", "offload": offload},
+                     "html": {"destination": tmpdir / "report.html", "offload": offload}})
+    assert (Table, (100, 1)) not in rendered
+    assert rendered.count((Table, (5, 1))) == 2
+
+
+def test_save_all_unknown_format(report):
+    with pytest.raises(ValueError):
+        report.save_all({"docx": "report.docx"})
+
+
+def test_save_all_raises_export_error(tmpdir, report, content):
+    report.add_header1(content)
+    md_path = tmpdir / "report.md"
+    with pytest.raises(ValueError):
+        report.save_all({"markdown": md_path, "html": {"destination": tmpdir / "r.html",
+                                                       "engine": "fake"}})
+    assert md_path.read() == "# content"
+
+
+def test_save_html_relocates_plots(tmpdir, report):
+    src = tmpdir.mkdir("src").join("plot.png")
+    src.write("png")
+    report.add_plot(str(src))
+    dst = tmpdir.mkdir("dst").join("report.html")
+    report.save_html(dst, cp_img_to_path=True)
+    assert tmpdir.join("dst", "plots", "plot.png").read() == "png"
+
+
+def test_compact_report(content):
+    report = Report(compact=True)
+    report.add_header1(content)
+    report.add_unordered_list([content, content])
+    out = io.StringIO()
+    report.save_markdown(out)
+    assert out.getvalue() == "# content\n* content\n* content\n"
+
+
+def test_add_lazy_plot_relocated(tmpdir, report):
+    calls = []
+    def make_plot():
+        calls.append(1)
+        path = tmpdir.join("plot.png")
+        path.write("png")
+        return str(path)
+
+    report.add_lazy_plot(make_plot, title="title")
+    assert not calls
+    dst = tmpdir.mkdir("dst").join("report.html")
+    report.save_html(dst, cp_img_to_path=True)
+    report.save_markdown(io.StringIO())
+    assert len(calls) == 1
+    assert tmpdir.join("dst", "plots", "plot.png").read() == "png"
+
+
+def test_add_lazy_table(report):
+    report.add_lazy_table(lambda: pd.DataFrame({"a": [1, 2, 3]}), max_rows=2, index=False)
+    out = io.StringIO()
+    report.save_markdown(out)
+    assert out.getvalue() == "| a |\n|---:|\n| 1 |\n| ... |\n| 3 |\n"
+
+
+def test_profiling(report, content):
+    summaries = []
+    report.add_header1(content)
+    report.add_paragraph(content)
+    assert report.get_profile() is None
+
+    report.enable_profiling(callback=summaries.append)
+    report.save_markdown(io.StringIO())
+    report.save_markdown(io.StringIO())
+    profile = report.get_profile()
+    assert profile["stages"]["save_markdown"]["calls"] == 2
+    assert profile["stages"]["write"]["calls"] == 2
+    assert profile["components"]["Header"]["calls"] == 2
+    assert profile["components"]["Paragraph"]["chars"] == 2 * len(Paragraph(content).to_markdown())
+    assert profile["cache"]["hits"] == 2
+    assert len(summaries) == 2
+
+    report.disable_profiling()
+    report.save_markdown(io.StringIO())
+    assert report.get_profile() is None
+
+
+def test_markdown_save_skips_heavy_imports(tmpdir):
+    script = ("import sys; from ouroboreport.report import Report; r = Report(); "
+              "r.add_header1('h'); r.add_unordered_list(['a']); "
+              f"r.save_markdown({str(tmpdir.join('r.md'))!r}); "
+              f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_import_time_budget():
+    def import_time():
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                                 "import ouroboreport.report"],
+                                capture_output=True, text=True, check=True)
+        line = result.stderr.strip().splitlines()[-1]
+        assert line.endswith("| ouroboreport.report")
+        return int(line.split("|")[1])
+
+    assert min(import_time() for _ in range(3)) < IMPORT_BUDGET_US
+
+
+def test_add_reports_keeps_metadata(fake_component):
+    report = Report(title="first", author="me")
+    report.add_component(fake_component)
+    combined = report + Report(title="second")
+    assert (combined.title, combined.author) == ("first", "me")
+    assert report.get_components() == [fake_component]
+
+
+def test_iadd_reports(report, content):
+    report.add_header1(content)
+    other = Report()
+    other.add_paragraph(content)
+    title = report.title
+    report += other
+    assert report.title == title
+    assert report.get_components() == [Header(content, 1), Paragraph(content)]
+
+
+def test_merge_reports(content):
+    shards = []
+    for i in range(3):
+        shard = Report(title=f"shard {i}", compact=bool(i))
+        shard.add_header1(f"{content} {i}")
+        shard.add_component(FakeComponent())
+        shards.append(shard)
+    merged = Report.merge(*shards, title="merged")
+    assert merged.title == "merged"
+    assert len(merged.get_components()) == 6
+    assert merged.get_components()[2] == Header(f"{content} 1", 1)
+    assert merged.get_components()[1] is shards[0].get_components()[1]
+
+
+def test_merge_compact_reports(content):
+    shards = []
+    for i in range(3):
+        shard = Report(compact=True)
+        shard.add_header1(f"{content} {i}")
+        shard.add_unordered_list([content, str(i)])
+        shard.add_component(FakeComponent())
+        shards.append(shard)
+    merged = Report.merge(*shards)
+    assert list(merged.get_components()) == [c for s in shards for c in s.get_components()]
+    assert merged.get_components()[8] is shards[2].get_components()[2]
+
+
+def test_extend_components(report, content):
+    report.extend_components(Header(f"{content} {i}", 1) for i in range(3))
+    assert len(report.get_components()) == 3
+
+
+def _build_shard(args):
+    directory, i = args
+    shard = Report(title=f"shard {i}", author="worker")
+    shard.add_header1(f"Shard {i}")
+    shard.add_table(pd.DataFrame({"a": [i, i + 1]}), index=False)
+    return shard.save_segment(directory)
+
+
+def test_report_from_segments(tmpdir):
+    pytest.importorskip("pyarrow")
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        directories = list(pool.map(_build_shard, [(tmpdir / f"s{i}", i) for i in range(3)]))
+
+    report = Report.from_segments(*directories, title="merged")
+    assert (report.title, report.author) == ("merged", "worker")
+    merged = report + Report.from_segments(directories[0])
+    assert len(merged.components.segments) == 4
+    out = io.StringIO()
+    merged.save_markdown(out)
+    assert out.getvalue().startswith("# Shard 0\n| a |\n|---:|\n| 0 |\n| 1 |\n\n# Shard 1\n")
+
+
+def test_dump_and_load(tmpdir, content):
+    pytest.importorskip("pyarrow")
+    plot = tmpdir.join("plot.png")
+    plot.write("png")
+    report = Report(title="title", author="author")
+    report.add_header1(content)
+    report.add_plot(str(plot), title="plot")
+    report.add_table(pd.DataFrame({"a": [1.25]}), precision=1)
+    expected = io.StringIO()
+    report.save_markdown(expected)
+
+    report.dump(tmpdir / "ir")
+    plot.remove()
+    loaded = Report.load(tmpdir / "ir")
+    assert (loaded.title, loaded.author) == ("title", "author")
+    assert len(loaded.get_components()) == 3
+    stored = loaded.get_components()[1].get_path()
+    assert stored.parent == tmpdir / "ir" / "images" and stored.read_text() == "png"
+    out = io.StringIO()
+    loaded.save_markdown(out)
+    assert out.getvalue() == expected.getvalue().replace(str(plot), str(stored))
+    loaded.save_html(tmpdir / "report.html", embed_images=True)
+    assert "data:image/png;base64,cG5n" in tmpdir.join("report.html").read()
@@ -0,0 +1,123 @@
+import json
+import pickle
+
+import pandas as pd
+import pytest
+
+from pathlib import Path
+from ouroboreport.components import CheckboxList
+from ouroboreport.components import Header
+from ouroboreport.components import Lazy
+from ouroboreport.components import OrderedList
+from ouroboreport.components import Paragraph
+from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.components import UnorderedList
+from ouroboreport.segment import Segment
+from ouroboreport.segment import SegmentChain
+from ouroboreport.segment import write_segment
+
+pytest.importorskip("pyarrow")
+
+
+class FakeComponent():
+    def __init__(self, text):
+        self.text = text
+
+    def to_markdown(self):
+        return self.text
+
+
+@pytest.fixture
+def components():
+    df = pd.DataFrame({"a": [1.5, 2.5], 3: ["x", "y"]}, index=["r1", "r2"])
+    return [Header("Head", 2), Paragraph("PPP"), UnorderedList(["a", 1]),
+            OrderedList(["c"]), CheckboxList([]), Plot(Path("test.png").resolve(), "title", "alt"),
+            Table(df, max_rows=5, precision=1), FakeComponent("fake"),
+            Lazy(lambda: "lazy", Paragraph)]
+
+
+def test_segment_roundtrip(tmpdir, components):
+    segment = Segment(write_segment(components, tmpdir / "seg", title="t", author="a"),
+                      allow_pickle=True)
+    assert (segment.title, segment.author, len(segment)) == ("t", "a", len(components))
+    for stored, component in zip(segment, components):
+        assert stored.to_markdown() == component.to_markdown()
+    assert segment[-1] == Paragraph("lazy")
+
+
+def test_segment_pickle_needs_allow_pickle(tmpdir, components):
+    segment = Segment(write_segment(components, tmpdir / "seg"))
+    assert segment[0] == components[0]
+    with pytest.raises(ValueError):
+        segment[7]
+
+
+def test_segment_tables_load_when_rendered(tmpdir, components):
+    segment = Segment(write_segment(components, tmpdir / "seg"))
+    table = segment[6]
+    assert isinstance(table, Lazy)
+    assert table.resolve().content.equals(components[6].content)
+    assert table.resolve() is not table.resolve()
+
+
+def test_segment_pickles_tables_parquet_cannot_store(tmpdir):
+    table = Table(pd.DataFrame({"a": [1, "x"]}))
+    path = write_segment([table], tmpdir / "seg")
+    assert not list(path.glob("*.parquet"))
+    with pytest.raises(ValueError):
+        Segment(path)[0]
+    assert Segment(path, allow_pickle=True)[0] == table
+
+
+def test_segment_version(tmpdir):
+    path = write_segment([], tmpdir / "seg")
+    assert json.loads((path / "index.json").read_text())["version"] == 1
+    (path / "index.json").write_text(json.dumps({"version": 0, "components": []}))
+    with pytest.raises(ValueError):
+        len(Segment(path))
+
+
+def test_segment_chain(tmpdir):
+    first = Segment(write_segment([Header("1"), Paragraph("2")], tmpdir / "a"))
+    second = Segment(write_segment([Paragraph("3")], tmpdir / "b"))
+    chain = SegmentChain([first])
+    chain.append(Paragraph("tail"))
+    chain.extend(SegmentChain([second]))
+    assert len(chain) == 4
+    assert list(chain) == [Header("1"), Paragraph("2"), Paragraph("tail"), Paragraph("3")]
+    assert chain[-1] == Paragraph("3")
+    assert chain[1:3] == [Paragraph("2"), Paragraph("tail")]
+    assert chain.segments == [first, second]
+    with pytest.raises(IndexError):
+        chain[4]
+    assert len(pickle.loads(pickle.dumps(chain))) == 4
+
+
+def test_segment_table_column_labels(tmpdir):
+    columns = pd.MultiIndex.from_tuples([("a", 1), ("a", 2), ("b", 1)], names=["key", "n"])
+    tables = [Table(pd.DataFrame([[1, 2, 3]], columns=columns)),
+              Table(pd.DataFrame([[1, 2]], columns=pd.Index(["x", "y"], name="letters")))]
+    segment = Segment(write_segment(tables, tmpdir / "seg"))
+    for stored, table in zip(segment, tables):
+        pd.testing.assert_index_equal(stored.resolve().content.columns, table.content.columns)
+
+
+def test_segment_references_images_by_absolute_path(tmpdir, monkeypatch):
+    tmpdir.join("a.png").write("image")
+    monkeypatch.chdir(tmpdir)
+    path = write_segment([Plot("a.png")], tmpdir / "seg")
+    monkeypatch.chdir(tmpdir / "seg")
+    assert Segment(path)[0].get_path() == Path(tmpdir / "a.png").resolve()
+
+
+def test_segment_stores_images_by_content(tmpdir):
+    for name in ("a.png", "b.png"):
+        tmpdir.join(name).write("same")
+    plots = [Plot(tmpdir / "a.png"), Plot(tmpdir / "b.png")]
+    segment = Segment(write_segment(plots, tmpdir / "seg", images="content"))
+    paths = [plot.get_path() for plot in segment]
+    assert paths[0] == paths[1]
+    assert paths[0].parent == tmpdir / "seg" / "images"
+    with pytest.raises(ValueError):
+        write_segment(plots, tmpdir / "seg", images="inline")
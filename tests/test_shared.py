@@ -1,6 +1,17 @@
+import copy
+import io
 import os
+import pickle
+import pytest
 
+from concurrent.futures import ThreadPoolExecutor
+
+from ouroboreport.shared import filedigest
 from ouroboreport.shared import ifnotexistmkdir
+from ouroboreport.shared import isfilelike
+from ouroboreport.shared import LockedState
+from ouroboreport.shared import relocate_file
+from ouroboreport.shared import textdigest
 
 
 def test_ifnotexistmkdir(tmpdir):
@@ -8,3 +19,89 @@ def test_ifnotexistmkdir(tmpdir):
     newdir_made = ifnotexistmkdir(newdir)
     assert newdir_made == newdir
     assert os.path.exists(newdir_made)
+
+
+def test_isfilelike(tmpdir):
+    assert isfilelike(io.StringIO())
+    assert not isfilelike(tmpdir / "test.md")
+    assert not isfilelike("test.md")
+
+
+def test_filedigest(tmpdir):
+    path = tmpdir / "plot.png"
+    path.write("png")
+    assert filedigest(path) == textdigest("png")
+    path.write("new png")
+    assert filedigest(path) != textdigest("png")
+
+
+@pytest.mark.parametrize("strategy", ["copy", "hardlink", "reflink", "symlink"])
+def test_relocate_file(tmpdir, strategy):
+    src = tmpdir / "src.png"
+    src.write("png")
+    dest = relocate_file(src, tmpdir / "dest.png", strategy=strategy)
+    assert dest.read_text() == "png"
+    assert dest.is_symlink() == (strategy == "symlink")
+
+
+def test_relocate_file_hardlink_shares_inode(tmpdir):
+    src = tmpdir / "src.png"
+    src.write("png")
+    dest = relocate_file(src, tmpdir / "dest.png", strategy="hardlink")
+    assert os.path.samefile(src, dest)
+
+
+def test_relocate_file_skips_identical(tmpdir):
+    src = tmpdir / "src.png"
+    src.write("png")
+    dest = relocate_file(src, tmpdir / "dest.png")
+    mtime = os.stat(dest).st_mtime_ns
+    relocate_file(src, dest)
+    assert os.stat(dest).st_mtime_ns == mtime
+
+
+def test_relocate_file_replaces_changed(tmpdir):
+    src = tmpdir / "src.png"
+    src.write("png")
+    dest = relocate_file(src, tmpdir / "dest.png", strategy="symlink")
+    src2 = tmpdir / "src2.png"
+    src2.write("new png")
+    relocate_file(src2, dest)
+    assert not dest.is_symlink()
+    assert dest.read_text() == "new png"
+
+
+@pytest.mark.parametrize("strategy", ["copy", "hardlink", "symlink"])
+def test_relocate_file_concurrent(tmpdir, strategy):
+    sources = []
+    for i in range(8):
+        src = tmpdir / f"src{i}.png"
+        src.write(f"png {i}")
+        sources.append(src)
+    dest = tmpdir / "dest.png"
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda src: relocate_file(src, dest, strategy=strategy), sources * 20))
+    assert dest.read() in {f"png {i}" for i in range(8)}
+    assert sorted(os.listdir(tmpdir)) == sorted(["dest.png"] + [s.basename for s in sources])
+
+
+def test_relocate_file_known_digest(tmpdir):
+    src = tmpdir / "src.png"
+    src.write("png")
+    dest = relocate_file(src, tmpdir / "dest.png", digest=filedigest(src))
+    mtime = os.stat(dest).st_mtime_ns
+    relocate_file(src, dest, digest=filedigest(src))
+    assert os.stat(dest).st_mtime_ns == mtime
+
+
+class Counter(LockedState):
+    def __init__(self):
+        super().__init__()
+        self.count = 1
+
+
+def test_locked_state_pickles():
+    counter = pickle.loads(pickle.dumps(Counter()))
+    assert counter.count == 1
+    with counter._lock:
+        assert copy.copy(counter)._lock is not counter._lock
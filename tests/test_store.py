@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from ouroboreport.components import CheckboxList
+from ouroboreport.components import Header
+from ouroboreport.components import OrderedList
+from ouroboreport.components import Paragraph
+from ouroboreport.components import Plot
+from ouroboreport.components import Table
+from ouroboreport.components import UnorderedList
+from ouroboreport.store import ComponentStore
+
+
+@pytest.fixture
+def components():
+    return [Header("Head", 2), Paragraph("PPP"), UnorderedList(["a", "b"]),
+            OrderedList(["c"]), CheckboxList([]), Plot("test.png", "title", "alt"),
+            Table(pd.DataFrame([[1, 2]])), Paragraph("ünïcode")]
+
+
+def test_store_roundtrip(components):
+    store = ComponentStore(components)
+    assert len(store) == len(components)
+    for stored, component in zip(store, components):
+        assert type(stored) is type(component)
+        assert stored.to_markdown() == component.to_markdown()
+        assert stored.to_html() == component.to_html()
+    assert store[0].level == 2
+
+
+def test_store_keeps_other_objects(components):
+    store = ComponentStore(components)
+    assert store[6] is components[6]
+
+
+def test_store_indexing(components):
+    store = ComponentStore(components)
+    assert store[-1] == Paragraph("ünïcode")
+    assert store[1:3] == [Paragraph("PPP"), UnorderedList(["a", "b"])]
+    with pytest.raises(IndexError):
+        store[len(components)]
+
+
+def test_store_add(components):
+    store = ComponentStore(components[:2]) + components[2:4]
+    assert isinstance(store, ComponentStore)
+    assert [type(c) for c in store] == [Header, Paragraph, UnorderedList, OrderedList]
+    store = components[:1] + ComponentStore(components[1:2])
+    assert list(store) == components[:2]
+
+
+def test_store_extend_store(components):
+    store = ComponentStore(components)
+    store.extend(ComponentStore(components))
+    store.extend(store)
+    assert len(store) == 4 * len(components)
+    assert [c.to_markdown() for c in store] == [c.to_markdown() for c in components] * 4
+    assert store[len(components) * 3 + 6] is components[6]
+
+
+def test_store_list_items_as_strings():
+    store = ComponentStore([UnorderedList([1, 2])])
+    assert store[0].content == ["1", "2"]
+
+
+def test_store_empty_strings():
+    store = ComponentStore([UnorderedList([]), UnorderedList([""]), Paragraph("")])
+    assert [c.content for c in store] == [[], [""], ""]
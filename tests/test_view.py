@@ -0,0 +1,32 @@
+import pytest
+
+from ouroboreport.components import Paragraph
+from ouroboreport.report import Report
+from ouroboreport.view import ReportView
+
+
+@pytest.fixture
+def report():
+    report = Report(title="Title", author="Author")
+    report.add_paragraph("a")
+    report.add_paragraph("b")
+    return report
+
+
+def test_view_shares_components(report):
+    view = ReportView(report)
+    assert view.get_components() is report.get_components()
+
+
+def test_view_substitute(report):
+    view = ReportView(report)
+    view.substitute(1, Paragraph("c"))
+    assert view.components == [Paragraph("a"), Paragraph("c")]
+    assert view.components[0] is report.components[0]
+    assert report.components[1] == Paragraph("b")
+
+
+def test_view_proxies_attributes(report):
+    view = ReportView(report)
+    assert view.title == "Title"
+    assert view.author == "Author"